@@ -11,13 +11,12 @@ CLI entry point. Simplified flow:
 from __future__ import annotations
 
 import argparse
-import json
 import logging
 import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import pandas as pd
-
 
 def main():
     parser = argparse.ArgumentParser(
@@ -30,6 +29,16 @@ def main():
     parser.add_argument("--period", default=None, help="Period to use (YYYY-MM, YYYY, or 'last')")
     parser.add_argument("--model", default="gpt-5-mini-2025-08-07", help="OpenAI model")
     parser.add_argument("--max_repair_rounds", type=int, default=2)
+    parser.add_argument("--max_concurrency", type=int, default=4,
+                        help="Max. number of sheets analysed in parallel")
+    parser.add_argument("--batch_size", type=int, default=50,
+                        help="Accounts per mapping prompt (smaller = faster answers, more calls)")
+    parser.add_argument("--max_parallel_batches", type=int, default=10,
+                        help="Max. number of mapping prompts in flight at the same time")
+    parser.add_argument("--emit_csv", action="store_true",
+                        help="Also write mapping.csv next to mapping.parquet")
+    parser.add_argument("--batch_api", action="store_true",
+                        help="Map accounts via the OpenAI Batch API (50%% cheaper, up to 24h)")
     parser.add_argument("--verbose", "-v", action="store_true")
     args = parser.parse_args()
 
@@ -40,15 +49,19 @@ def main():
     )
     log = logging.getLogger("pipeline")
 
-    # Imports (after arg parsing so --help is fast)
+    # Imports (after arg parsing so --help is fast — pandas alone takes ~0.5s)
+    import numpy as np
+    import orjson
+    import pandas as pd
+
     from src.io_readers import read_excel
     from src.llm_client import LLMClient
-    from src.table_detect import detect_tables, extract_by_detection
+    from src.table_detect import detect_tables, detection_prompt_body, extract_by_detection
     from src.normalize import rules_from_detection, apply_classification, normalize_amounts, deduplicate_accounts
     from src.targets import load_targets, targets_to_whitelist
     from src.mapping import map_accounts
     from src.validate import run_checks, repair_mappings
-    from src.reporting import generate_report
+    from src.reporting import generate_report, write_mapping
 
     out_dir = Path(args.out)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -56,93 +69,140 @@ def main():
     # ── Init ───────────────────────────────────────────────────────────
     log.info("Starting pipeline (model: %s)", args.model)
     llm = LLMClient(model=args.model, cache_db_path=out_dir / "llm_cache.db")
-
-    # ── Load targets ───────────────────────────────────────────────────
-    log.info("Loading target positions from %s", args.targets)
-    targets = load_targets(args.targets)
-    log.info("Loaded %d target positions", len(targets))
-
-    # ── Read SuSa ──────────────────────────────────────────────────────
-    log.info("Reading SuSa file %s", args.susa)
-    sheets = read_excel(args.susa)
-    log.info("Found %d sheets: %s", len(sheets), list(sheets.keys()))
-
-    all_accounts = []
-
-    for sheet_name, df in sheets.items():
-        log.info("━━━ Sheet: %s (%d×%d) ━━━", sheet_name, *df.shape)
-
-        # ── LLM Call 1: detect table + rules + sign convention ─────────
-        detections = detect_tables(llm, sheet_name, df)
-        if not detections:
-            log.warning("No tables detected in '%s', skipping", sheet_name)
-            continue
-
-        for det in detections:
-            log.info("  Table '%s': rows %d-%d, confidence %.2f, signs=%s",
-                     det.table_id, det.start_row, det.end_row,
-                     det.confidence, det.sign_convention)
-
-            # ── Python: extract → classify → normalize ─────────────────
-            extracted = extract_by_detection(df, det)
-            if extracted.empty or "konto_nr" not in extracted.columns:
-                log.warning("  No account data extracted, skipping")
-                continue
-
-            rules = rules_from_detection(det)
-            classified = apply_classification(extracted, rules)
-            classified = normalize_amounts(
-                classified, rules.amount_strategy,
-                period=args.period, language_hint=det.language_guess,
-            )
-            classified = deduplicate_accounts(classified)
-
-            # Add source info
-            classified["source_file"] = str(args.susa)
-            classified["sheet"] = sheet_name
-            classified["_sign_convention"] = det.sign_convention
-
-            account_count = len(classified[classified["row_type"] == "ACCOUNT"])
-            log.info("  → %d accounts extracted", account_count)
-            all_accounts.append(classified)
-
-    if not all_accounts:
-        log.error("No accounts extracted from any sheet!")
-        sys.exit(1)
-
-    # Combine all sheets
-    full_df = pd.concat(all_accounts, ignore_index=True)
-    log.info("Total: %d rows (%d accounts)",
-             len(full_df), len(full_df[full_df["row_type"] == "ACCOUNT"]))
-
-    # ── LLM Call 2: map accounts to targets ────────────────────────────
-    log.info("Mapping accounts to target positions...")
-    full_df = map_accounts(llm, full_df, targets)
-
-    # ── Python: validate + optional LLM repair ─────────────────────────
-    log.info("Running validation checks...")
-    checks = run_checks(full_df)
-    # log.info("Balance diff: %.2f (%.1f%%), Unmapped: %d",
-    #          checks["balance_diff"], checks["balance_diff_pct"], checks["unmapped_count"])
-    log.info("Unmapped: %d", checks["unmapped_count"])
-
-    if checks["has_issues"]:
-        log.info("Issues detected, running repair (max %d rounds)...", args.max_repair_rounds)
-        whitelist = targets_to_whitelist(targets)
-        full_df = repair_mappings(llm, full_df, whitelist, checks, args.max_repair_rounds)
+    # Close in finally: early exits must still drain the write-behind cache
+    try:
+        # ── Load targets ───────────────────────────────────────────────
+        log.info("Loading target positions from %s", args.targets)
+        targets = load_targets(args.targets)
+        log.info("Loaded %d target positions", len(targets))
+
+        # ── Read SuSa ──────────────────────────────────────────────────
+        log.info("Reading SuSa file %s", args.susa)
+        sheets = read_excel(args.susa)
+        log.info("Found %d sheets: %s", len(sheets), list(sheets.keys()))
+
+        def process_sheet(sheet_name: str, df: pd.DataFrame, detections: list) -> list:
+            """Extract the detected tables of one sheet; return (sheet, sign_convention, DataFrame) per table."""
+            log.info("━━━ Sheet: %s (%d×%d) ━━━", sheet_name, *df.shape)
+
+            if not detections:
+                log.warning("No tables detected in '%s', skipping", sheet_name)
+                return []
+
+            results = []
+            for det in detections:
+                log.info("  [%s] Table '%s': rows %d-%d, confidence %.2f, signs=%s",
+                         sheet_name, det.table_id, det.start_row, det.end_row,
+                         det.confidence, det.sign_convention)
+
+                # ── Python: extract → classify → normalize ─────────────────
+                extracted = extract_by_detection(df, det)
+                if extracted.empty or "konto_nr" not in extracted.columns:
+                    log.warning("  [%s] No account data extracted, skipping", sheet_name)
+                    continue
+
+                rules = rules_from_detection(det)
+                classified = apply_classification(extracted, rules)
+                classified = normalize_amounts(
+                    classified, rules.amount_strategy,
+                    period=args.period, language_hint=det.language_guess,
+                )
+                classified = deduplicate_accounts(classified)
+
+                account_count = len(classified[classified["row_type"] == "ACCOUNT"])
+                log.info("  [%s] → %d accounts extracted", sheet_name, account_count)
+                results.append((sheet_name, det.sign_convention, classified))
+            return results
+
+        def detect_group(names: list) -> list:
+            first = names[0]
+            if len(names) > 1:
+                log.info("Sheets %s share one layout, detecting once via '%s'", names, first)
+            return detect_tables(llm, first, sheets[first], prompt_body=prompt_bodies[first])
+
+        # Sheets are independent — the LLM calls dominate wall time, so run them
+        # in parallel. pool.map keeps the original sheet order for the concat.
+        workers = max(1, min(args.max_concurrency, len(sheets)))
+        all_accounts = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # ── LLM Call 1: detect table + rules + sign convention ─────────
+            # Sheets with the same layout (e.g. one sheet per month) produce the
+            # same prompt body → one detection call per distinct body.
+            prompt_bodies = dict(zip(sheets, pool.map(detection_prompt_body, sheets.values())))
+            groups = defaultdict(list)
+            for name, body in prompt_bodies.items():
+                groups[body].append(name)
+            log.info("%d sheets → %d distinct detection prompts", len(sheets), len(groups))
+
+            detections = {}
+            for names, dets in zip(groups.values(), pool.map(detect_group, groups.values())):
+                for name in names:
+                    detections[name] = dets
+
+            # ── Python: extract → classify → normalize (per sheet) ─────────
+            for sheet_results in pool.map(
+                lambda name: process_sheet(name, sheets[name], detections[name]), sheets
+            ):
+                all_accounts.extend(sheet_results)
+
+        if not all_accounts:
+            log.error("No accounts extracted from any sheet!")
+            sys.exit(1)
+
+        # Combine all sheets
+        full_df = pd.concat([frame for _, _, frame in all_accounts], ignore_index=True)
+
+        # Source info is constant per table: build it once on the combined frame
+        # (categoricals from per-table lengths) instead of per-sheet string columns.
+        lengths = [len(frame) for _, _, frame in all_accounts]
+        sheet_codes, sheet_names = pd.Series([sheet for sheet, _, _ in all_accounts]).factorize()
+        sign_codes, sign_names = pd.Series([sign for _, sign, _ in all_accounts]).factorize()
+        full_df["source_file"] = pd.Categorical.from_codes(np.zeros(len(full_df), dtype=np.int8), [str(args.susa)])
+        # Few distinct values per column → categorical codes instead of one str per row.
+        # row_type already is one (fixed ROW_TYPES categories from apply_classification).
+        full_df["sheet"] = pd.Categorical.from_codes(np.repeat(sheet_codes, lengths), sheet_names)
+        full_df["_sign_convention"] = pd.Categorical.from_codes(np.repeat(sign_codes, lengths), sign_names)
+
+        log.info("Total: %d rows (%d accounts)",
+                 len(full_df), len(full_df[full_df["row_type"] == "ACCOUNT"]))
+
+        # ── LLM Call 2: map accounts to targets ────────────────────────
+        log.info("Mapping accounts to target positions...")
+        full_df = map_accounts(
+            llm, full_df, targets,
+            batch_size=args.batch_size,
+            max_parallel=args.max_parallel_batches,
+            use_batch_api=args.batch_api,
+        )
+
+        # ── Python: validate + optional LLM repair ─────────────────────
+        log.info("Running validation checks...")
         checks = run_checks(full_df)
-
-    # ── Python: outputs ────────────────────────────────────────────────
-    log.info("Writing outputs...")
-    full_df.to_csv(out_dir / "mapping.csv", index=False, encoding="utf-8-sig")
-
-    generate_report(full_df, checks, {}, out_dir)
-
-    # Done
-    log.info("━━━ Pipeline complete ━━━")
-    log.info("  Outputs in: %s", out_dir)
-    log.info("  LLM stats: %s", json.dumps(llm.stats))
-    llm.close()
+        # log.info("Balance diff: %.2f (%.1f%%), Unmapped: %d",
+        #          checks["balance_diff"], checks["balance_diff_pct"], checks["unmapped_count"])
+        log.info("Unmapped: %d", checks["unmapped_count"])
+
+        if checks["has_issues"]:
+            log.info("Issues detected, running repair (max %d rounds)...", args.max_repair_rounds)
+            whitelist = targets_to_whitelist(targets)
+            full_df = repair_mappings(llm, full_df, whitelist, checks, args.max_repair_rounds)
+            checks = run_checks(full_df)
+
+        # ── Python: outputs ────────────────────────────────────────────
+        log.info("Writing outputs...")
+        # Mapping export and report touch disjoint files and only read full_df → overlap them
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            f_mapping = pool.submit(write_mapping, full_df, out_dir, emit_csv=args.emit_csv)
+            f_report = pool.submit(generate_report, full_df, checks, {}, out_dir)
+            f_mapping.result()
+            f_report.result()
+
+        # Done
+        log.info("━━━ Pipeline complete ━━━")
+        log.info("  Outputs in: %s", out_dir)
+        log.info("  LLM stats: %s", orjson.dumps(llm.stats).decode())
+    finally:
+        llm.close()
 
 
 if __name__ == "__main__":
@@ -15,58 +15,22 @@ Zwei Aufgaben:
 
 Pool-Quelle: Reiter 'Mapping' in Dummykonten_Zuordnung_hart.xlsx
     Spalten: Überposition | Dummy Konto Name | OID | TargetDimensionID
+    (geladen über dummy_pool.load_dummy_pool, hier re-exportiert)
 """
 from __future__ import annotations
 
 import logging
-from collections import defaultdict
 from pathlib import Path
 from typing import Dict, List, Optional
 
-import openpyxl
+import numpy as np
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
 
-logger = logging.getLogger(__name__)
-
-
-# ---------------------------------------------------------------------------
-# Pool laden
-# ---------------------------------------------------------------------------
-
-def load_dummy_pool(dummy_xlsx: str | Path) -> Dict[str, List[dict]]:
-    """
-    Lädt Reiter 'Mapping' → Dict: normalize(überposition) → [{name, oid, dimension}, …]
-    Reihenfolge bleibt erhalten (First-Come-First-Served).
-    """
-    dummy_xlsx = Path(dummy_xlsx)
-    wb = openpyxl.load_workbook(str(dummy_xlsx), read_only=True, data_only=True)
-    if "Mapping" not in wb.sheetnames:
-        raise ValueError(f"Kein Reiter 'Mapping' in {dummy_xlsx}")
-
-    ws = wb["Mapping"]
-    pool: Dict[str, List[dict]] = defaultdict(list)
-
-    header_skipped = False
-    for row in ws.iter_rows(values_only=True):
-        if not header_skipped:
-            header_skipped = True
-            continue
-        ueberpos, dummy_name, oid, dimension = row[0], row[1], row[2], row[3]
-        if not ueberpos or not dummy_name:
-            continue
-        key = _normalize(str(ueberpos))
-        pool[key].append({
-            "name":         dummy_name,
-            "oid":          int(oid) if oid is not None else None,
-            "dimension":    dimension,
-            "ueberpos_raw": ueberpos,
-        })
-
-    wb.close()
-    total = sum(len(v) for v in pool.values())
-    logger.info("Dummy-Pool geladen: %d Überpositionen, %d Dummy-Konten", len(pool), total)
-    return pool
+from .dummy_pool import load_dummy_pool, normalize as _normalize
 
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 # Pool-Überpositionen als TargetPosition-Objekte (für KI-Whitelist)
@@ -124,51 +88,55 @@ def assign_dummy_ids(
     Keine Dummy-Konten verfügbar → Felder leer, Warning ins Log.
     """
     df = mapped_df.copy()
-    pointer: Dict[str, int] = defaultdict(int)
-    dummy_names, dummy_oids, dummy_dimensions = [], [], []
-
-    for _, row in df.iterrows():
-        if row.get("row_type") != "ACCOUNT":
-            dummy_names.append("")
-            dummy_oids.append(None)
-            dummy_dimensions.append("")
-            continue
+    n = len(df)
+    dummy_names = np.full(n, "", dtype=object)
+    dummy_oids = np.full(n, None, dtype=object)
+    dummy_dimensions = np.full(n, "", dtype=object)
+
+    def _col(name: str) -> pd.Series:
+        if name in df.columns:
+            return df[name].fillna("").astype(str).str.strip()
+        return pd.Series("", index=df.index, dtype=object)
+
+    overpos_names = _col(target_name_col)
+    overpos_ids = _col("target_overpos_id")
+    mask = (
+        (_col("row_type") == "ACCOUNT")
+        & ~overpos_names.isin(["UNMAPPED", "nan", ""])
+    ).to_numpy()
+
+    # target_overpos_id enthält den normalisierten Pool-Key (gesetzt von map_accounts)
+    use_id = (overpos_ids != "") & (overpos_ids != "UNMAPPED")
+    keys = overpos_ids.where(use_id, overpos_names.map(_normalize)).to_numpy()[mask]
+    names_raw = overpos_names.to_numpy()[mask]
+    positions = np.flatnonzero(mask)
+
+    # Innerhalb einer Gruppe ist die Reihenfolge die Zeilenreihenfolge, d.h.
+    # die k-te Zeile eines Keys bekommt den k-ten Dummy (First-Come-First-Served).
+    groups = pd.Series(positions).groupby(keys, sort=False).indices
+    for key, group_idx in groups.items():
+        rows = positions[group_idx]
+        pool_list = dummy_pool.get(key, [])
+        overpos_name = names_raw[group_idx[0]]
 
-        overpos_name = str(row.get(target_name_col, "") or "").strip()
-        if not overpos_name or overpos_name in ("UNMAPPED", "nan", ""):
-            dummy_names.append("")
-            dummy_oids.append(None)
-            dummy_dimensions.append("")
+        if not pool_list:
+            logger.warning("Keine Pool-Position für KI-Target '%s' (key='%s', %d Konten)",
+                           overpos_name, key, len(rows))
             continue
 
-        # target_overpos_id enthält den normalisierten Pool-Key (gesetzt von map_accounts)
-        overpos_id = str(row.get("target_overpos_id", "") or "").strip()
-        key = overpos_id if overpos_id and overpos_id != "UNMAPPED" else _normalize(overpos_name)
+        k = min(len(rows), len(pool_list))
+        if k < len(rows):
+            logger.warning("Dummy-Pool erschöpft für '%s' (%d/%d belegt, %d Konten ohne Dummy)",
+                           overpos_name, len(pool_list), len(pool_list), len(rows) - k)
 
-        pool_list = dummy_pool.get(key, [])
-        idx = pointer[key]
+        used = pool_list[:k]
+        dummy_names[rows[:k]] = [d["name"] for d in used]
+        dummy_oids[rows[:k]] = [d["oid"] for d in used]
+        dummy_dimensions[rows[:k]] = [d["dimension"] for d in used]
 
-        if not pool_list:
-            logger.warning("Keine Pool-Position für KI-Target '%s' (key='%s')", overpos_name, key)
-            dummy_names.append("")
-            dummy_oids.append(None)
-            dummy_dimensions.append("")
-        elif idx >= len(pool_list):
-            logger.warning("Dummy-Pool erschöpft für '%s' (%d/%d belegt)",
-                           overpos_name, idx, len(pool_list))
-            dummy_names.append("")
-            dummy_oids.append(None)
-            dummy_dimensions.append("")
-        else:
-            dummy = pool_list[idx]
-            dummy_names.append(dummy["name"])
-            dummy_oids.append(dummy["oid"])
-            dummy_dimensions.append(dummy["dimension"])
-            pointer[key] += 1
-
-    df["dummy_name"]      = dummy_names
-    df["dummy_oid"]       = dummy_oids
-    df["dummy_dimension"] = dummy_dimensions
+    df["dummy_name"]      = dummy_names.tolist()
+    df["dummy_oid"]       = dummy_oids.tolist()
+    df["dummy_dimension"] = dummy_dimensions.tolist()
     return df
 
 
@@ -189,29 +157,30 @@ def build_lucanet_df(mapped_df: pd.DataFrame) -> pd.DataFrame:
         (mapped_df["row_type"] == "ACCOUNT") &
         (mapped_df["dummy_oid"].notna()) &
         (mapped_df["dummy_oid"] != "")
-    ].copy()
-
-    rows = []
-    for _, row in accounts.iterrows():
-        nr   = str(row.get("konto_nr",   "") or "").strip()
-        name = str(row.get("konto_name", "") or "").strip()
-        source_name = f"{nr} {name}".strip() if nr else name
-
-        rows.append({
-            "SourceName":              source_name,
-            "TargetName":              row["dummy_name"],
-            "TargetElementID":         int(row["dummy_oid"]),
-            "TargetDimensionID":       row["dummy_dimension"],
-            "Type":                    "Account",
-            "DefaultCurrency":         "",
-            "DecimalDigits":           0,
-            "FirstPeriodOfFiscalYear": 0,
-            "StartMonth":              "",
-            "EndMonth":                "",
-            "AccountingAreaID":        "",
-        })
-
-    return pd.DataFrame(rows, columns=_LUCANET_HEADER)
+    ]
+
+    def _text(col: str) -> pd.Series:
+        if col not in accounts.columns:
+            return pd.Series("", index=accounts.index, dtype=object)
+        return accounts[col].fillna("").astype(str).str.strip()
+
+    nr, name = _text("konto_nr"), _text("konto_name")
+    source_name = (nr + " " + name).str.strip().where(nr != "", name)
+
+    lucanet_df = pd.DataFrame({
+        "SourceName":              source_name,
+        "TargetName":              accounts["dummy_name"],
+        "TargetElementID":         accounts["dummy_oid"].astype(int),
+        "TargetDimensionID":       accounts["dummy_dimension"],
+        "Type":                    "Account",
+        "DefaultCurrency":         "",
+        "DecimalDigits":           0,
+        "FirstPeriodOfFiscalYear": 0,
+        "StartMonth":              "",
+        "EndMonth":                "",
+        "AccountingAreaID":        "",
+    }, index=accounts.index, columns=_LUCANET_HEADER)
+    return lucanet_df.reset_index(drop=True)
 
 
 def save_lucanet_xlsx(lucanet_df: pd.DataFrame, out_path: str | Path) -> None:
@@ -219,20 +188,23 @@ def save_lucanet_xlsx(lucanet_df: pd.DataFrame, out_path: str | Path) -> None:
     out_path = Path(out_path)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with pd.ExcelWriter(str(out_path), engine="openpyxl") as writer:
-        lucanet_df.to_excel(writer, index=False, sheet_name="Lucanet Mapping")
-        ws = writer.sheets["Lucanet Mapping"]
-        for col_cells in ws.columns:
-            max_len = max(len(str(c.value) if c.value is not None else "") for c in col_cells)
-            ws.column_dimensions[col_cells[0].column_letter].width = min(max_len + 4, 60)
+    # write_only streamt die Zeilen direkt in die Datei. Spaltenbreiten müssen
+    # dort vor der ersten Zeile gesetzt werden → vorab spaltenweise berechnen.
+    values = lucanet_df.astype(object).where(lucanet_df.notna(), None)
+    cell_lens = values.map(lambda v: len(str(v)) if v is not None else 0)
+    widths = [
+        max(len(str(header)), int(cell_lens[header].max()) if len(values) else 0)
+        for header in lucanet_df.columns
+    ]
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Lucanet Mapping")
+    for i, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = min(width + 4, 60)
+
+    ws.append(list(lucanet_df.columns))
+    for row in values.itertuples(index=False, name=None):
+        ws.append(row)
+    wb.save(str(out_path))
 
     logger.info("Lucanet-Export gespeichert: %s (%d Zeilen)", out_path, len(lucanet_df))
-
-
-# ---------------------------------------------------------------------------
-# Hilfsfunktion
-# ---------------------------------------------------------------------------
-
-def _normalize(text: str) -> str:
-    """Normalisiert für robusten Schlüsselvergleich."""
-    return " ".join(text.strip().split()).lower()
@@ -0,0 +1,85 @@
+"""
+dummy_pool.py
+-------------
+Gemeinsamer Loader für den Dummy-Pool (Reiter 'Mapping' in
+Dummykonten_Zuordnung_hart.xlsx), genutzt von dummy_mapper.py und
+generate_lucanet_mapping.py.
+
+    Spalten: Überposition | Dummy Konto Name | OID | TargetDimensionID
+
+Der Pool wird pro (absoluter Pfad, mtime) nur einmal geparst; weitere Aufrufe
+im selben Prozess bekommen das gecachte Dict zurück (nicht verändern!).
+"""
+from __future__ import annotations
+
+import logging
+import re
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Whitespace-Läufe für die spaltenweise Key-Normalisierung (= normalize)
+_WS = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Normalisiert für robusten Schlüsselvergleich (memoisiert — Namen wiederholen sich)."""
+    if not isinstance(text, str):
+        return ""
+    return _normalize_str(text)
+
+
+@lru_cache(maxsize=None)
+def _normalize_str(text: str) -> str:
+    return " ".join(text.strip().split()).lower()
+
+
+def load_dummy_pool(dummy_xlsx: str | Path) -> Dict[str, List[dict]]:
+    """
+    Lädt Reiter 'Mapping' → Dict: normalize(überposition) → [{name, oid, dimension, ueberpos_raw}, …]
+    Reihenfolge bleibt erhalten (First-Come-First-Served).
+    """
+    path = Path(dummy_xlsx).resolve()
+    return _load_dummy_pool_cached(str(path), path.stat().st_mtime)
+
+
+@lru_cache(maxsize=4)
+def _load_dummy_pool_cached(path: str, mtime: float) -> Dict[str, List[dict]]:
+    try:
+        xls = pd.ExcelFile(path, engine="calamine")
+    except ImportError:
+        # python-calamine nicht installiert → langsamerer openpyxl-Reader
+        xls = pd.ExcelFile(path, engine="openpyxl")
+    if "Mapping" not in xls.sheet_names:
+        raise ValueError(f"Kein Reiter 'Mapping' in {path}")
+
+    # Kopfzeile wird von header=0 übersprungen
+    df = xls.parse(
+        "Mapping", header=0, usecols=[0, 1, 2, 3],
+        names=["ueberpos", "name", "oid", "dimension"], dtype=object,
+    )
+    xls.close()
+    df = df[df["ueberpos"].notna() & df["name"].notna()
+            & (df["ueberpos"] != "") & (df["name"] != "")]
+    df = df.astype(object).where(df.notna(), None)
+    keys = df["ueberpos"].astype(str).str.replace(_WS, " ", regex=True).str.strip().str.lower()
+
+    pool: Dict[str, List[dict]] = defaultdict(list)
+    for key, ueberpos, dummy_name, oid, dimension in zip(
+        keys, df["ueberpos"], df["name"], df["oid"], df["dimension"]
+    ):
+        pool[key].append({
+            "name":         dummy_name,
+            "oid":          int(oid) if oid is not None else None,
+            "dimension":    dimension,
+            "ueberpos_raw": ueberpos,
+        })
+
+    total = sum(len(v) for v in pool.values())
+    logger.info("Dummy-Pool geladen: %d Überpositionen, %d Dummy-Konten", len(pool), total)
+    return pool
@@ -33,58 +33,16 @@ from pathlib import Path
 import openpyxl
 from openpyxl import Workbook
 
+try:
+    from src.dummy_pool import load_dummy_pool, normalize
+except ImportError:  # als Skript gestartet: python src/generate_lucanet_mapping.py
+    from dummy_pool import load_dummy_pool, normalize
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Hilfsfunktionen
 # ──────────────────────────────────────────────────────────────────────────────
 
-def normalize(text: str) -> str:
-    """Normalisiert einen String für robuste Vergleiche."""
-    if not isinstance(text, str):
-        return ""
-    return " ".join(text.strip().split()).lower()
-
-
-def load_dummy_pool(dummy_xlsx: Path) -> dict[str, list[dict]]:
-    """
-    Lädt den Reiter 'Mapping' aus der Dummykonten-Datei.
-
-    Gibt ein Dict zurück:
-        normalized_überposition → [ {name, oid, dimension}, ... ]
-    Die Liste enthält die Dummy-Konten in ihrer ursprünglichen Reihenfolge,
-    damit wir immer das erste freie vergeben können.
-    """
-    wb = openpyxl.load_workbook(str(dummy_xlsx), read_only=True, data_only=True)
-    if "Mapping" not in wb.sheetnames:
-        raise ValueError(f"Kein Reiter 'Mapping' in {dummy_xlsx}")
-
-    ws = wb["Mapping"]
-    pool: dict[str, list[dict]] = defaultdict(list)
-
-    header_skipped = False
-    for row in ws.iter_rows(values_only=True):
-        if not header_skipped:
-            header_skipped = True
-            continue  # Kopfzeile überspringen
-
-        ueberpos, dummy_name, oid, dimension = row[0], row[1], row[2], row[3]
-        if not ueberpos or not dummy_name:
-            continue
-
-        key = normalize(str(ueberpos))
-        pool[key].append(
-            {
-                "name": dummy_name,
-                "oid": int(oid) if oid is not None else None,
-                "dimension": dimension,
-                "ueberpos_raw": ueberpos,
-            }
-        )
-
-    wb.close()
-    return pool
-
-
 def load_ki_output(ki_xlsx: Path) -> list[dict]:
     """
     Lädt den KI-Mapping-Output.
@@ -98,19 +56,26 @@ def load_ki_output(ki_xlsx: Path) -> list[dict]:
     wb = openpyxl.load_workbook(str(ki_xlsx), read_only=True, data_only=True)
     ws = wb.active
 
-    rows = list(ws.iter_rows(values_only=True))
-    if not rows:
+    # Zeilen lazy lesen statt alle Zellen vorab in eine Liste zu laden
+    rows = ws.iter_rows(values_only=True)
+    first = next(rows, None)
+    if first is None:
+        wb.close()
         raise ValueError(f"Keine Daten in {ki_xlsx}")
 
-    header = [str(h).strip() if h is not None else "" for h in rows[0]]
+    header = [str(h).strip() if h is not None else "" for h in first]
 
-    # Spaltenindizes ermitteln – case-insensitive
-    header_lower = [h.lower() for h in header]
+    # Spaltenindizes ermitteln – case-insensitive Teilstring-Suche.
+    # Kopfzeile einmal lowercase aufbereiten (leere Spalten entfallen), damit
+    # auch "Zuordnung LucaNet" oder "Konto-Nr. (SKR04)" gefunden werden.
+    header_lower = [(i, h.lower()) for i, h in enumerate(header) if h]
 
     def col(candidates: list[str]) -> int:
+        # Kandidaten sind bereits lowercase; erster Kandidat hat Vorrang,
+        # bei mehreren passenden Spalten gewinnt die erste
         for c in candidates:
-            for i, h in enumerate(header_lower):
-                if c.lower() in h:
+            for i, h in header_lower:
+                if c in h:
                     return i
         raise ValueError(f"Keine Spalte gefunden für: {candidates}")
 
@@ -119,7 +84,7 @@ def load_ki_output(ki_xlsx: Path) -> list[dict]:
     idx_zuordnung = col(["unsere zuordnung", "lucanet"])
 
     accounts = []
-    for row in rows[1:]:
+    for row in rows:
         if not row or all(v is None for v in row):
             continue
         nr        = str(row[idx_nr]).strip()   if row[idx_nr]        is not None else ""
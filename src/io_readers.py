@@ -5,42 +5,171 @@ from __future__ import annotations
 
 import re
 import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Optional, List, Any
 
 import pandas as pd
 import numpy as np
+from pandas.api.types import infer_dtype, is_numeric_dtype
+
+try:
+    import python_calamine  # noqa: F401  (Rust-based reader, used via pandas engine="calamine")
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def _sheet_str_dtype() -> Any:
+    """Arrow-backed string dtype with NaN as missing value (= pandas 3 "str").
+
+    Keeps the NaN semantics of dtype=str (str(nan) == "nan", no pd.NA in
+    boolean masks) while storing cells in one Arrow buffer instead of one
+    Python object per cell.
+    """
+    if not HAS_PYARROW:
+        return str
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        return pd.StringDtype("pyarrow_numpy")  # pandas 2.2
+
+
+_SHEET_STR_DTYPE = _sheet_str_dtype()
+
+
+# ---------------------------------------------------------------------------
+# Precompiled patterns
+# ---------------------------------------------------------------------------
+
+# Numeric shapes — German 1.234,56 | English 1,234.56 | plain 1234,56 / 1234.56.
+# Explicit [0-9] instead of \d: the Arrow regex engine behind the pandas string
+# dtype only knows ASCII digits, so both engines agree.
+_NUM_DE = r"-?[0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]+)?"
+_NUM_EN = r"-?[0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]+)?"
+_NUM_PLAIN = r"-?[0-9]+(?:[.,][0-9]+)?"
+_NUM_RE = re.compile(rf"^(?:{_NUM_DE}|{_NUM_EN}|{_NUM_PLAIN})$")
+# Currency symbols, whitespace and parentheses are ignored for numeric detection
+_NUM_NOISE_RE = re.compile(r"[€$£¥₹\s()]")
+# parse_number: currency symbols/codes and whitespace
+_CURRENCY_RE = re.compile(r"[€$£¥₹CHF\s]")
+
+# parse_number_series: plain-string patterns so pandas can hand them to the
+# Arrow regex engine (compiled patterns fall back to Python's re per value).
+# Whitespace is spelled out because Arrow's \s only covers ASCII whitespace.
+_UNICODE_WS = "".join(c for c in map(chr, range(0x3001)) if c.isspace())
+_CURRENCY_PAT = "[€$£¥₹CHF" + _UNICODE_WS + "]"
+_NUM_NOISE_PAT = "[€$£¥₹()" + _UNICODE_WS + "]"
+# German shapes as decided by _detect_number_locale: comma after the last dot |
+# comma + 1-2 digits | comma + 3 digits with at most 3 chars before | 1.234
+_GERMAN_NUMBER_PAT = (
+    r"\.[^.]*,[^.]*$"
+    r"|,[0-9]{1,2}$"
+    r"|^(?:,*[^,]){0,3},+[0-9]{3}$"
+    r"|^[0-9]{1,3}\.[^.]{3}$"
+)
+# detect_column_locale: shapes that only one locale can produce. Ambiguous
+# values such as 1.234 / 1,234 / 123.456 vote for neither.
+_DE_ONLY_RE = re.compile(
+    r"^-?(?:[0-9]{1,3}(?:\.[0-9]{3})+,[0-9]+|[0-9]+,(?:[0-9]{1,2}|[0-9]{4,})"
+    r"|[0-9]{4,},[0-9]+|[0-9]{1,3}(?:\.[0-9]{3}){2,})$"
+)
+_EN_ONLY_RE = re.compile(
+    r"^-?(?:[0-9]{1,3}(?:,[0-9]{3})+\.[0-9]+|[0-9]+\.(?:[0-9]{1,2}|[0-9]{4,})"
+    r"|[0-9]{4,}\.[0-9]+|[0-9]{1,3}(?:,[0-9]{3}){2,})$"
+)
+_FLOAT_PAT = r"[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?"
+
+_ACCT_RE = re.compile(r"^[0-9]{3,6}$")
+_DATE_RE = re.compile(r"[0-9]{2}[./][0-9]{2}[./][0-9]{2,4}")
+
+_SIDE_VALUES = {"S", "H", "D", "C", "SOLL", "HABEN", "DEBIT", "CREDIT"}
+_PROFILE_KEYWORDS = ["summe", "gesamt", "total", "saldo", "endsaldo", "balance", "debit",
+                     "credit", "soll", "haben", "beginning", "anfang", "end", "sold",
+                     "bilanz", "result", "ergebnis"]
 
 
 # ---------------------------------------------------------------------------
 # File readers
 # ---------------------------------------------------------------------------
 
-def read_excel(path: str | Path) -> Dict[str, pd.DataFrame]:
+def read_excel(
+    path: str | Path,
+    max_rows: Optional[int] = None,
+    max_cols: Optional[int] = None,
+    parallel: bool = True,
+) -> Dict[str, pd.DataFrame]:
     """Read an Excel file and return {sheet_name: DataFrame}.
-    Supports .xlsx (openpyxl) and .xls (xlrd).
+    Supports .xlsx (python-calamine if installed, else openpyxl) and .xls (xlrd).
+    calamine parses large workbooks several times faster than the pure-Python
+    openpyxl and yields the same string cells with dtype=str. Cells are stored
+    as Arrow-backed strings if pyarrow is installed.
+
+    ``max_rows`` / ``max_cols`` limit what is parsed at all (e.g. for a
+    snapshot), rows and cells beyond them are skipped by the reader.
+
+    With ``parallel`` and calamine the sheets are parsed in a thread pool, one
+    workbook handle per worker. openpyxl and xlrd parse sequentially (pure
+    Python under the GIL, and not documented as thread-safe). Sheet order is
+    preserved.
     """
     path = Path(path)
     if not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
 
+    parse_kwargs: Dict[str, Any] = {"dtype": _SHEET_STR_DTYPE}
+    if max_rows:
+        parse_kwargs["nrows"] = max_rows
+
     ext = path.suffix.lower()
     if ext == ".xlsx":
-        engine = "openpyxl"
+        engine = "calamine" if HAS_CALAMINE else "openpyxl"
     elif ext == ".xls":
         engine = "xlrd"
     elif ext == ".csv":
-        df = pd.read_csv(path, dtype=str)
+        if max_cols:
+            # Positional usecols must not exceed the actual column count
+            n_cols = len(pd.read_csv(path, nrows=0).columns)
+            parse_kwargs["usecols"] = list(range(min(n_cols, max_cols)))
+        df = pd.read_csv(path, **parse_kwargs)
         return {path.stem: df}
     else:
         raise ValueError(f"Unsupported file extension: {ext}")
 
-    xls = pd.ExcelFile(path, engine=engine)
-    sheets: Dict[str, pd.DataFrame] = {}
-    for name in xls.sheet_names:
-        df = xls.parse(name, header=None, dtype=str)
-        sheets[name] = df
-    return sheets
+    if max_cols:
+        # header=None → column labels are 0..n-1; a callable tolerates narrow sheets
+        parse_kwargs["usecols"] = lambda col: col < max_cols
+
+    with pd.ExcelFile(path, engine=engine) as xls:
+        names = xls.sheet_names
+        if not parallel or engine != "calamine" or len(names) < 2:
+            return {name: xls.parse(name, header=None, **parse_kwargs) for name in names}
+
+        # A calamine workbook cannot be shared across threads ("Already
+        # mutably borrowed") → one handle per worker.
+        local = threading.local()
+        handles: List[pd.ExcelFile] = []
+
+        def _parse(name: str) -> tuple[str, pd.DataFrame]:
+            book = getattr(local, "xls", None)
+            if book is None:
+                book = local.xls = pd.ExcelFile(path, engine=engine)
+                handles.append(book)
+            return name, book.parse(name, header=None, **parse_kwargs)
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(8, len(names))) as pool:
+                return dict(pool.map(_parse, names))
+        finally:
+            for book in handles:
+                book.close()
 
 
 # ---------------------------------------------------------------------------
@@ -78,16 +207,25 @@ def make_sheet_snapshot(
     lines.append("     | " + " | ".join(f"{c:>12s}" for c in col_labels))
     lines.append("-----+" + "-+-".join("-" * 12 for _ in col_labels))
 
-    for row_idx in range(sub.shape[0]):
-        row_num = row_idx + 1  # 1-based like Excel
-        vals = [str(sub.iat[row_idx, c])[:12].rjust(12) for c in range(sub.shape[1])]
-        lines.append(f"{row_num:4d} | " + " | ".join(vals))
+    # Cells are truncated/padded column-wise, then each row joined in one str.cat
+    cells = [sub.iloc[:, c].astype(str).str.slice(0, 12).str.pad(12) for c in range(sub.shape[1])]
+    if cells:
+        rows = cells[0].str.cat(cells[1:], sep=" | ").tolist()
+    else:
+        rows = [""] * sub.shape[0]
+    lines.extend(f"{row_num:4d} | {row}" for row_num, row in enumerate(rows, start=1))
 
     return "\n".join(lines)
 
 
 def _col_letter(idx: int) -> str:
     """Convert 0-based column index to Excel column letter(s)."""
+    if idx < _EXCEL_MAX_COLS:
+        return _COL_LETTERS[idx]
+    return _compute_col_letter(idx)  # nur CSV kann breiter als XFD sein
+
+
+def _compute_col_letter(idx: int) -> str:
     result = ""
     while True:
         result = chr(65 + idx % 26) + result
@@ -97,6 +235,11 @@ def _col_letter(idx: int) -> str:
     return result
 
 
+# Alle Excel-Spalten A..XFD einmal beim Import vorberechnen → O(1)-Lookup
+_EXCEL_MAX_COLS = 16384
+_COL_LETTERS = tuple(_compute_col_letter(i) for i in range(_EXCEL_MAX_COLS))
+
+
 # ---------------------------------------------------------------------------
 # Column profiling
 # ---------------------------------------------------------------------------
@@ -107,43 +250,37 @@ def column_profile(df: pd.DataFrame) -> List[Dict[str, Any]]:
     for col_idx in range(df.shape[1]):
         col = df.iloc[:, col_idx]
         total = len(col)
-        non_empty = col.dropna().astype(str).str.strip().replace("", pd.NA).dropna()
+        non_empty = col.astype("string").str.strip()
+        non_empty = non_empty[non_empty.notna() & (non_empty != "")]
         n_non_empty = len(non_empty)
 
-        # Numeric detection
-        n_numeric = 0
-        for v in non_empty:
-            if _looks_numeric(str(v)):
-                n_numeric += 1
+        # Numeric detection (one regex pass over the whole column)
+        n_numeric = int(
+            non_empty.str.replace(_NUM_NOISE_RE, "", regex=True).str.match(_NUM_RE).sum()
+        )
 
         # Pattern detection
         patterns: list[str] = []
-        sample_vals = non_empty.head(20).tolist()
+        sample = non_empty.head(20)
+        sample_vals = sample.tolist()
 
         # Account number pattern (digits, possibly with dots)
-        acct_pattern = sum(1 for v in sample_vals if re.match(r"^\d{3,6}$", str(v).strip()))
-        if acct_pattern > 3:
+        if sample.str.match(_ACCT_RE).sum() > 3:
             patterns.append("ACCOUNT_NUMBER")
 
         # S/H indicator
-        sh_vals = {str(v).strip().upper() for v in sample_vals}
-        if sh_vals <= {"S", "H", "D", "C", "SOLL", "HABEN", "DEBIT", "CREDIT"}:
+        sh_vals = set(sample.str.upper())
+        if sh_vals <= _SIDE_VALUES:
             if len(sh_vals) >= 2:
                 patterns.append("SIDE_INDICATOR")
 
         # Date-like
-        date_count = sum(1 for v in sample_vals if re.search(r"\d{2}[./]\d{2}[./]\d{2,4}", str(v)))
-        if date_count > 3:
+        if sample.str.contains(_DATE_RE).sum() > 3:
             patterns.append("DATE")
 
-        # Keywords
-        keywords_found = []
-        all_text = " ".join(str(v).lower() for v in sample_vals)
-        for kw in ["summe", "gesamt", "total", "saldo", "endsaldo", "balance", "debit",
-                    "credit", "soll", "haben", "beginning", "anfang", "end", "sold",
-                    "bilanz", "result", "ergebnis"]:
-            if kw in all_text:
-                keywords_found.append(kw)
+        # Keywords (substring search, "endsaldo" also counts as "saldo"/"end")
+        all_text = " ".join(sample.str.lower())
+        keywords_found = [kw for kw in _PROFILE_KEYWORDS if kw in all_text]
 
         profiles.append({
             "col_index": col_idx,
@@ -154,7 +291,7 @@ def column_profile(df: pd.DataFrame) -> List[Dict[str, Any]]:
             "numeric_ratio": round(n_numeric / max(n_non_empty, 1), 3),
             "patterns": patterns,
             "keywords": keywords_found,
-            "sample_values": [str(v)[:50] for v in sample_vals[:10]],
+            "sample_values": [v[:50] for v in sample_vals[:10]],
         })
     return profiles
 
@@ -164,21 +301,9 @@ def _looks_numeric(s: str) -> bool:
     s = s.strip()
     if not s:
         return False
-    # Remove currency symbols and whitespace
-    s = re.sub(r"[€$£¥₹\s]", "", s)
-    # Remove parentheses (negative)
-    s = re.sub(r"[()]", "", s)
-    # Try common patterns
-    # German: 1.234,56  or  1234,56
-    if re.match(r"^-?\d{1,3}(\.\d{3})*(,\d+)?$", s):
-        return True
-    # English: 1,234.56  or  1234.56
-    if re.match(r"^-?\d{1,3}(,\d{3})*(\.\d+)?$", s):
-        return True
-    # Plain number
-    if re.match(r"^-?\d+([.,]\d+)?$", s):
-        return True
-    return False
+    # Currency symbols, whitespace and parentheses (negative) removed in one pass,
+    # then German / English / plain shapes are matched by a single alternation.
+    return _NUM_RE.match(_NUM_NOISE_RE.sub("", s)) is not None
 
 
 # ---------------------------------------------------------------------------
@@ -216,7 +341,7 @@ def parse_number(text: str, locale_hint: str = "auto") -> Optional[float]:
         s = s[1:].strip()
 
     # Remove currency symbols
-    s = re.sub(r"[€$£¥₹CHF\s]", "", s)
+    s = _CURRENCY_RE.sub("", s)
     # Remove apostrophe thousand separator
     s = s.replace("'", "")
 
@@ -245,6 +370,52 @@ def parse_number(text: str, locale_hint: str = "auto") -> Optional[float]:
         return None
 
 
+def detect_column_locale(values: pd.Series, default: str = "de", sample_size: int = 50) -> str:
+    """Detect the number format of a whole column ("de" or "en") by majority vote.
+
+    Looks at the first ``sample_size`` non-empty values; only unambiguous
+    shapes vote (1.234,56 / 1234,5 → de; 1,234.56 / 1234.5 → en). Numeric
+    Excel cells read with dtype=str arrive as "1234.5" and therefore count
+    as English. Without a majority ``default`` is returned.
+    """
+    de = en = 0
+    seen = 0
+    for v in values:
+        if v is None or (isinstance(v, float) and math.isnan(v)):
+            continue
+        s = _NUM_NOISE_RE.sub("", str(v)).replace("'", "")
+        if not s:
+            continue
+        seen += 1
+        if _DE_ONLY_RE.match(s):
+            de += 1
+        elif _EN_ONLY_RE.match(s):
+            en += 1
+        if seen >= sample_size:
+            break
+    if de > en:
+        return "de"
+    if en > de:
+        return "en"
+    return default
+
+
+def locale_conflict_mask(values: pd.Series, locale: str) -> np.ndarray:
+    """Boolean array: True where a string cell can only be read in the other locale.
+
+    Used with :func:`detect_column_locale`: the column locale is meant for
+    ambiguous values only, so a German "2.500,00" in a column that is mostly
+    numeric ("1234.5" → en) keeps its own format (same shapes as the vote).
+    """
+    other_only = _EN_ONLY_RE if locale == "de" else _DE_ONLY_RE
+    s = (
+        values.astype("string")
+        .str.replace(_NUM_NOISE_PAT, "", regex=True)
+        .str.replace("'", "", regex=False)
+    )
+    return s.str.match(other_only.pattern).fillna(False).to_numpy(dtype=bool)
+
+
 def _detect_number_locale(s: str) -> str:
     """Heuristic: detect if a number string is German or English format."""
     # If there's a comma after a dot → German (1.234,56)
@@ -281,3 +452,74 @@ def _detect_number_locale(s: str) -> str:
         return "en"
 
     return "en"  # Default
+
+
+def parse_number_series(values: pd.Series, locale_hint: str = "auto") -> pd.Series:
+    """Column-wise :func:`parse_number` → float64 Series (NaN where it returns None).
+
+    Cleaning, sign handling and locale detection run as vectorized ``.str``
+    operations. Plain decimal strings are cast in one go; anything else
+    (e.g. "inf", "1_000") falls back to ``float()`` so the result matches the
+    scalar parser.
+    """
+    if is_numeric_dtype(values.dtype):
+        return values.astype("float64")
+
+    result = pd.Series(np.nan, index=values.index, dtype="float64")
+    if values.dtype == object and infer_dtype(values, skipna=True) not in ("string", "empty"):
+        # Mixed column: non-string scalars (ints/floats from Excel) are taken as-is
+        is_text = values.map(lambda v: isinstance(v, str))
+        result[~is_text] = pd.to_numeric(values[~is_text], errors="coerce")
+        values = values[is_text]
+        if values.empty:
+            return result
+
+    s = values.astype("string").fillna("").str.strip(_UNICODE_WS)
+
+    # Negative via parentheses or leading minus
+    paren = (s.str.startswith("(") & s.str.endswith(")")).to_numpy(dtype=bool)
+    s = s.mask(paren, s.str.slice(1, -1).str.strip(_UNICODE_WS))
+    minus = ~paren & s.str.startswith("-").to_numpy(dtype=bool)
+    s = s.mask(minus, s.str.slice(1).str.strip(_UNICODE_WS))
+
+    s = s.str.replace(_CURRENCY_PAT, "", regex=True).str.replace("'", "", regex=False)
+
+    # With a fixed hint only that locale's replacements run (no mask per row)
+    if locale_hint == "auto":
+        german = _detect_number_locale_series(s)
+        s = s.mask(german, _plain_de(s)).mask(~german, _plain_en(s))
+    elif locale_hint == "de":
+        s = _plain_de(s)
+    else:
+        s = _plain_en(s)
+
+    parsed = np.full(len(s), np.nan)
+    plain = s.str.fullmatch(_FLOAT_PAT).to_numpy(dtype=bool)
+    parsed[plain] = s[plain].astype("float64").to_numpy()
+    rest = ~plain & (s != "").to_numpy(dtype=bool)
+    if rest.any():
+        parsed[rest] = [_to_float(v) for v in s[rest]]
+    result[values.index] = np.where(paren | minus, -parsed, parsed)
+    return result
+
+
+def _plain_de(s: pd.Series) -> pd.Series:
+    """German → plain decimal: drop "." thousands, "," becomes the decimal point."""
+    return s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+
+
+def _plain_en(s: pd.Series) -> pd.Series:
+    """English → plain decimal: drop "," thousands."""
+    return s.str.replace(",", "", regex=False)
+
+
+def _to_float(s: str) -> float:
+    try:
+        return float(s)
+    except ValueError:
+        return np.nan
+
+
+def _detect_number_locale_series(s: pd.Series) -> np.ndarray:
+    """Vectorized :func:`_detect_number_locale` → boolean array (True = German)."""
+    return s.str.contains(_GERMAN_NUMBER_PAT).to_numpy(dtype=bool)
@@ -3,19 +3,23 @@ LLM Client — OpenAI API wrapper with retry, caching, JSON schema enforcement.
 """
 from __future__ import annotations
 
+import atexit
 import hashlib
 import json
 import logging
 import os
+import queue
 import re
 import sqlite3
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
 import httpx
+import orjson
 from openai import OpenAI
 from pydantic import BaseModel
 
@@ -25,20 +29,94 @@ logger = logging.getLogger(__name__)
 # Cache DB setup
 # ---------------------------------------------------------------------------
 
+# Keys are a 16-byte BLAKE2b digest of the canonicalized request, so the
+# table stays small and lookups are a fixed-width primary-key probe.
 _CREATE_CACHE_TABLE = """
-CREATE TABLE IF NOT EXISTS llm_cache (
-    cache_key TEXT PRIMARY KEY,
+CREATE TABLE IF NOT EXISTS llm_cache_v2 (
+    cache_key BLOB PRIMARY KEY,
     model TEXT,
-    prompt_hash TEXT,
-    system_hash TEXT,
     response_text TEXT,
-    tokens_prompt INTEGER,
-    tokens_completion INTEGER,
-    latency_ms INTEGER,
     created_at REAL
-)
+) WITHOUT ROWID
 """
 
+# Single call site per statement → sqlite3's per-connection statement cache
+# compiles each of them once.
+_SELECT_CACHE_ROW = "SELECT response_text FROM llm_cache_v2 WHERE cache_key = ?"
+_INSERT_CACHE_ROW = (
+    "INSERT OR REPLACE INTO llm_cache_v2 (cache_key, model, response_text, created_at) "
+    "VALUES (?, ?, ?, ?)"
+)
+
+# WAL lets readers proceed while the writer commits; synchronous=NORMAL skips
+# the fsync per commit (a crash may lose the last few cache rows, never corrupts).
+_CONN_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Cache lookups share one read-only connection with a larger page cache
+# (64 MB) so rows hit repeatedly by the mapper threads stay in memory.
+_READ_CONN_PRAGMAS = (
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Write-behind: responses are queued and flushed by one writer thread in
+# batches of up to _CACHE_FLUSH_MAX rows or every _CACHE_FLUSH_INTERVAL seconds.
+_CACHE_FLUSH_MAX = 64
+_CACHE_FLUSH_INTERVAL = 0.05
+
+# Pre-v2 table keyed by a hex SHA-256 of "model||schema_version||system||prompt".
+# It is left untouched: v2 misses fall back to it with the old key scheme and
+# hits are copied into llm_cache_v2, so paid responses survive the upgrade.
+_LEGACY_CACHE_TABLE = "llm_cache"
+_SELECT_LEGACY_ROW = f"SELECT response_text FROM {_LEGACY_CACHE_TABLE} WHERE cache_key = ?"
+
+
+def _loads(text: str) -> Any:
+    """orjson.loads with stdlib fallback for what orjson rejects (NaN, huge ints).
+
+    Raises json.JSONDecodeError (orjson.JSONDecodeError is a subclass).
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+
+def call_concurrently(
+    llm: Any,
+    requests: List[Dict[str, Any]],
+    max_workers: int = 10,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """Run ``llm.call(**request)`` for every request in a thread pool.
+
+    Results come back in request order. Works with any client that has a
+    ``call`` method (LLMClient or a test double). With ``return_exceptions``
+    a failed request yields its exception in place of a result instead of
+    aborting the others (like ``asyncio.gather``).
+    """
+    if not requests:
+        return []
+
+    def _call(request: Dict[str, Any]) -> Any:
+        try:
+            return llm.call(**request)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            return e
+
+    workers = max(1, min(max_workers, len(requests)))
+    if workers == 1:
+        return [_call(request) for request in requests]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_call, requests))
+
 
 class LLMClient:
     """Encapsulated OpenAI client with caching, retry, and JSON parsing."""
@@ -49,6 +127,7 @@ class LLMClient:
         api_key: Optional[str] = None,
         cache_db_path: str | Path = "llm_cache.db",
         max_retries: int = 3,
+        parallelism: int = 10,
     ):
         load_dotenv()
         self.model = model
@@ -62,11 +141,28 @@ class LLMClient:
         http_client = httpx.Client(trust_env=False, timeout=600.0)
         self.client = OpenAI(api_key=self.api_key, http_client=http_client)
         self.max_retries = max_retries
+        self.parallelism = parallelism    # concurrent requests in call_batch
 
         # SQLite cache — thread-local connections (safe for ThreadPoolExecutor)
         self.cache_db_path = Path(cache_db_path)
+        self._cache_db_file = str(self.cache_db_path)
         self._local = threading.local()   # each thread gets its own .conn
         self._ensure_schema()             # create table in main thread conn
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._read_lock = threading.Lock()
+
+        # Write-behind cache: rows queued for the writer thread, readable
+        # from _pending until they are committed
+        self._pending: Dict[bytes, tuple] = {}
+        self._write_queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        # The writer is a daemon thread: callers that never reach close()
+        # (early exit, exception, forgotten close) still get the queue drained
+        atexit.register(self.flush_cache)
+
+        # Serialized schema hint per json_schema object (schemas are constants)
+        self._schema_hints: Dict[int, tuple] = {}
 
         self._call_count = 0
         self._total_tokens = 0
@@ -85,15 +181,23 @@ class LLMClient:
         schema_version: str = "v1",
         use_cache: bool = True,
         reasoning_effort: Optional[str] = None,
+        prompt_cache_key: Optional[str] = None,
     ) -> Dict[str, Any] | str:
-        """Call the LLM. Returns parsed JSON dict if json_schema is given, else raw string."""
-        cache_key = self._make_cache_key(system_prompt, prompt, schema_version)
+        """Call the LLM. Returns parsed JSON dict if json_schema is given, else raw string.
+
+        ``prompt_cache_key`` groups requests with a shared prompt prefix for the
+        provider's prompt cache; it does not change the response.
+        """
+        cache_key = self._make_cache_key(
+            system_prompt, prompt, schema_version,
+            params={"temperature": temperature, "reasoning_effort": reasoning_effort},
+        )
 
         # Check cache
         if use_cache:
-            cached = self._get_cache(cache_key)
+            cached = self._lookup_cache(cache_key, system_prompt, prompt, schema_version)
             if cached is not None:
-                logger.info("Cache hit for key %s", cache_key[:16])
+                logger.info("Cache hit for key %s", cache_key.hex())
                 if json_schema:
                     return self._parse_json(cached)
                 return cached
@@ -106,7 +210,10 @@ class LLMClient:
 
         # Call with retry
         logger.info("Requesting LLM model %s (reasoning: %s, effort: %s)...", self.model, "gpt-5" in self.model or "o" in self.model, reasoning_effort)
-        response_text = self._call_with_retry(messages, temperature, json_schema, reasoning_effort=reasoning_effort)
+        response_text = self._call_with_retry(
+            messages, temperature, json_schema,
+            reasoning_effort=reasoning_effort, prompt_cache_key=prompt_cache_key,
+        )
 
         # Cache
         self._set_cache(cache_key, response_text)
@@ -125,19 +232,25 @@ class LLMClient:
         temperature: float = 0.1,
         schema_version: str = "v1",
     ) -> list[Dict[str, Any]]:
-        """Call LLM on batches of items. Returns list of parsed results."""
-        all_results = []
-        for i in range(0, len(items), batch_size):
-            batch = items[i:i + batch_size]
-            batch_json = json.dumps(batch, ensure_ascii=False, indent=None)
-            prompt = prompt_template.replace("{{BATCH}}", batch_json)
-            result = self.call(
-                prompt=prompt,
+        """Call LLM on batches of items. Returns list of parsed results.
+
+        Up to ``self.parallelism`` batches are in flight at the same time;
+        results keep the order of ``items``.
+        """
+        requests = [
+            dict(
+                prompt=prompt_template.replace(
+                    "{{BATCH}}", orjson.dumps(items[i:i + batch_size]).decode()
+                ),
                 system_prompt=system_prompt,
                 json_schema=json_schema,
                 temperature=temperature,
                 schema_version=schema_version,
             )
+            for i in range(0, len(items), batch_size)
+        ]
+        all_results = []
+        for result in call_concurrently(self, requests, self.parallelism):
             if isinstance(result, dict):
                 # Expected: {"results": [...]}
                 if "results" in result:
@@ -150,13 +263,165 @@ class LLMClient:
                 all_results.append(result)
         return all_results
 
+    def call_batch_api(
+        self,
+        requests: list[Dict[str, Any]],
+        poll_interval: float = 30.0,
+        max_poll_interval: float = 600.0,
+    ) -> list[Dict[str, Any] | str]:
+        """Run many independent calls through the OpenAI Batch API.
+
+        Each request is a dict with the keyword arguments of :meth:`call`
+        (``prompt``, ``system_prompt``, ``json_schema``, ...). Cached requests
+        are answered locally, the rest is submitted as one batch job (half the
+        token price, no RPM limit, up to 24h turnaround) and polled until done.
+        Returns the results in request order, parsed like :meth:`call`.
+        """
+        texts: Dict[int, str] = {}
+        keys: Dict[int, bytes] = {}
+        pending: list[Dict[str, Any]] = []
+
+        for i, req in enumerate(requests):
+            temperature = req.get("temperature", 0.1)
+            reasoning_effort = req.get("reasoning_effort")
+            system_prompt = req.get("system_prompt", "You are a helpful assistant.")
+            keys[i] = self._make_cache_key(
+                system_prompt, req["prompt"], req.get("schema_version", "v1"),
+                params={"temperature": temperature, "reasoning_effort": reasoning_effort},
+            )
+            cached = (
+                self._lookup_cache(keys[i], system_prompt, req["prompt"], req.get("schema_version", "v1"))
+                if req.get("use_cache", True) else None
+            )
+            if cached is not None:
+                texts[i] = cached
+                continue
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": req["prompt"]},
+            ]
+            pending.append({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._build_request(
+                    messages, temperature, req.get("json_schema"), reasoning_effort,
+                    req.get("prompt_cache_key"),
+                ),
+            })
+
+        logger.info("Batch API: %d requests, %d cached, %d to submit",
+                    len(requests), len(texts), len(pending))
+        if pending:
+            batch_id = self.submit_batch(pending)
+            batch = self.wait_for_batch(batch_id, poll_interval, max_poll_interval)
+            # Cache whatever finished, also for expired/cancelled jobs (partial output)
+            for custom_id, text in self._read_batch_output(batch).items():
+                i = int(custom_id)
+                texts[i] = text
+                self._set_cache(keys[i], text)
+            if batch.status != "completed":
+                raise RuntimeError(
+                    f"Batch job {batch_id} ended with status '{batch.status}' "
+                    f"({len(texts)}/{len(requests)} results cached)"
+                )
+
+        results: list[Dict[str, Any] | str] = []
+        for i, req in enumerate(requests):
+            text = texts.get(i)
+            if text is None:
+                results.append({"_raw": "", "_parse_error": True} if req.get("json_schema") else "")
+            elif req.get("json_schema"):
+                results.append(self._parse_json(text))
+            else:
+                results.append(text)
+        return results
+
+    def submit_batch(self, requests: list[Dict[str, Any]]) -> str:
+        """Upload batch requests (JSONL lines with custom_id/method/url/body) and start the job."""
+        payload = b"\n".join(orjson.dumps(r) for r in requests)
+        batch_file = self.client.files.create(
+            file=("batch_requests.jsonl", payload),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        logger.info("Batch API: submitted job %s (%d requests)", batch.id, len(requests))
+        return batch.id
+
+    def wait_for_batch(
+        self,
+        batch_id: str,
+        poll_interval: float = 30.0,
+        max_poll_interval: float = 600.0,
+    ) -> Any:
+        """Poll a batch job with exponential backoff until it reaches a final status.
+
+        Returns the batch object; expired or cancelled jobs may still carry
+        partial output in ``output_file_id``.
+        """
+        wait = poll_interval
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                return batch
+            logger.info("Batch API: job %s is %s, next check in %ds",
+                        batch_id, batch.status, int(wait))
+            time.sleep(wait)
+            wait = min(wait * 2, max_poll_interval)
+
+    def _read_batch_output(self, batch: Any) -> Dict[str, str]:
+        """Successful responses of a finished batch job as {custom_id: response_text}."""
+        texts: Dict[str, str] = {}
+        if not batch.output_file_id:
+            logger.error("Batch API: job %s (%s) has no output file", batch.id, batch.status)
+            return texts
+
+        content = self.client.files.content(batch.output_file_id).content
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            entry = orjson.loads(line)
+            response = entry.get("response") or {}
+            if entry.get("error") or response.get("status_code") != 200:
+                logger.warning("Batch API: request %s failed: %s",
+                               entry.get("custom_id"), entry.get("error") or response.get("status_code"))
+                continue
+            body = response.get("body", {})
+            usage = body.get("usage") or {}
+            with self._stats_lock:
+                self._call_count += 1
+                self._total_tokens += usage.get("total_tokens", 0) or 0
+            texts[entry["custom_id"]] = body["choices"][0]["message"]["content"] or ""
+        return texts
+
+    def get_item_results(self, namespace: str, item_keys: List[str]) -> Dict[str, Any]:
+        """Cached per-item results (e.g. one mapped account) stored by set_item_results.
+
+        Returns {item_key: result} for the keys that are cached under ``namespace``.
+        """
+        hits: Dict[str, Any] = {}
+        for item_key in dict.fromkeys(item_keys):
+            cached = self._get_cache(self._make_item_key(namespace, item_key))
+            if cached is not None:
+                hits[item_key] = _loads(cached)
+        return hits
+
+    def set_item_results(self, namespace: str, results: Dict[str, Any]) -> None:
+        """Cache one JSON-serializable result per item key under ``namespace``."""
+        for item_key, result in results.items():
+            self._set_cache(self._make_item_key(namespace, item_key), orjson.dumps(result).decode())
+
     @property
     def stats(self) -> Dict[str, Any]:
         return {
             "call_count": self._call_count,
             "total_tokens": self._total_tokens,
             "model": self.model,
-            "cache_db": str(self.cache_db_path),
+            "cache_db": self._cache_db_file,
         }
 
     # ------------------------------------------------------------------
@@ -166,13 +431,85 @@ class LLMClient:
     def _get_conn(self) -> sqlite3.Connection:
         """Return a per-thread SQLite connection (creates one if needed)."""
         if not hasattr(self._local, "conn") or self._local.conn is None:
-            self._local.conn = sqlite3.connect(str(self.cache_db_path))
+            conn = sqlite3.connect(self._cache_db_file)
+            for pragma in _CONN_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
         return self._local.conn
 
+    def _get_read_conn(self) -> sqlite3.Connection:
+        """Return the read-only connection shared by all threads for cache lookups."""
+        if self._read_conn is None:
+            with self._read_lock:
+                if self._read_conn is None:
+                    conn = sqlite3.connect(
+                        f"{self.cache_db_path.resolve().as_uri()}?mode=ro",
+                        uri=True, check_same_thread=False,
+                    )
+                    for pragma in _READ_CONN_PRAGMAS:
+                        conn.execute(pragma)
+                    self._read_conn = conn
+        return self._read_conn
+
     def _ensure_schema(self) -> None:
         conn = self._get_conn()
         conn.execute(_CREATE_CACHE_TABLE)
+        legacy = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (_LEGACY_CACHE_TABLE,),
+        ).fetchone()
         conn.commit()
+        self._has_legacy_cache = legacy is not None
+        if self._has_legacy_cache:
+            logger.info("Legacy LLM cache table '%s' found, used as read-only fallback",
+                        _LEGACY_CACHE_TABLE)
+
+    def _build_request(
+        self,
+        messages: list,
+        temperature: float,
+        json_schema: Optional[Dict[str, Any]] = None,
+        reasoning_effort: Optional[str] = None,
+        prompt_cache_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Build the chat.completions request body for the configured model."""
+        kwargs: Dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+        }
+
+        if "gpt-5" in self.model or "o1" in self.model or "o3" in self.model:
+            # Reasoning models: reasoning_effort is supported, temperature often restricted
+            kwargs["reasoning_effort"] = reasoning_effort or "low"
+            kwargs["max_completion_tokens"] = 64000
+        else:
+            kwargs["temperature"] = temperature
+            kwargs["max_tokens"] = 16000
+
+        if prompt_cache_key:
+            kwargs["prompt_cache_key"] = prompt_cache_key
+
+        if json_schema:
+            kwargs["response_format"] = {"type": "json_object"}
+            # Append schema hint to system message
+            schema_hint = self._schema_hint(json_schema)
+            kwargs["messages"] = [
+                {**messages[0], "content": messages[0]["content"] + schema_hint},
+                *messages[1:],
+            ]
+        return kwargs
+
+    def _schema_hint(self, json_schema: Dict[str, Any]) -> str:
+        """System-prompt suffix describing ``json_schema``, serialized once per schema."""
+        cached = self._schema_hints.get(id(json_schema))
+        if cached is not None and cached[0] is json_schema:
+            return cached[1]
+        hint = (
+            "\n\nYou MUST respond with valid JSON matching this schema:\n"
+            + orjson.dumps(json_schema, option=orjson.OPT_INDENT_2).decode()
+        )
+        self._schema_hints[id(json_schema)] = (json_schema, hint)
+        return hint
 
     def _call_with_retry(
         self,
@@ -180,37 +517,16 @@ class LLMClient:
         temperature: float,
         json_schema: Optional[Dict[str, Any]] = None,
         reasoning_effort: Optional[str] = None,
+        prompt_cache_key: Optional[str] = None,
     ) -> str:
+        # Request body is identical for every attempt → build it once
+        kwargs = self._build_request(
+            messages, temperature, json_schema, reasoning_effort, prompt_cache_key
+        )
         last_error = None
         for attempt in range(1, self.max_retries + 1):
             try:
                 t0 = time.time()
-
-                kwargs: Dict[str, Any] = {
-                    "model": self.model,
-                    "messages": messages,
-                }
-                
-                if "gpt-5" in self.model or "o1" in self.model or "o3" in self.model:
-                    # Reasoning models: reasoning_effort is supported, temperature often restricted
-                    kwargs["reasoning_effort"] = reasoning_effort or "low"
-                    kwargs["max_completion_tokens"] = 64000
-                else:
-                    kwargs["temperature"] = temperature
-                    kwargs["max_tokens"] = 16000
-                
-                if json_schema:
-                    kwargs["response_format"] = {"type": "json_object"}
-                    # Append schema hint to system message
-                    schema_hint = (
-                        "\n\nYou MUST respond with valid JSON matching this schema:\n"
-                        + json.dumps(json_schema, indent=2)
-                    )
-                    kwargs["messages"] = [
-                        {**messages[0], "content": messages[0]["content"] + schema_hint},
-                        *messages[1:],
-                    ]
-
                 response = self.client.chat.completions.create(**kwargs)
                 text = response.choices[0].message.content or ""
 
@@ -257,7 +573,7 @@ class LLMClient:
             text = "\n".join(lines)
 
         try:
-            return json.loads(text)
+            return _loads(text)
         except json.JSONDecodeError:
             pass
 
@@ -265,7 +581,7 @@ class LLMClient:
         match = re.search(r"(\{[\s\S]*\}|\[[\s\S]*\])", text)
         if match:
             try:
-                return json.loads(match.group(1))
+                return _loads(match.group(1))
             except json.JSONDecodeError:
                 pass
 
@@ -273,31 +589,123 @@ class LLMClient:
         text_fixed = text.replace("'", '"')
         text_fixed = re.sub(r",\s*([}\]])", r"\1", text_fixed)  # trailing commas
         try:
-            return json.loads(text_fixed)
+            return _loads(text_fixed)
         except json.JSONDecodeError:
             logger.error("Failed to parse JSON from LLM response:\n%s", text[:500])
             return {"_raw": text, "_parse_error": True}
 
-    def _make_cache_key(self, system_prompt: str, prompt: str, schema_version: str) -> str:
-        payload = f"{self.model}||{schema_version}||{system_prompt}||{prompt}"
-        return hashlib.sha256(payload.encode()).hexdigest()
+    def _make_cache_key(
+        self,
+        system_prompt: str,
+        prompt: str,
+        schema_version: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        payload = orjson.dumps(
+            {
+                "model": self.model,
+                "schema_version": schema_version,
+                "system": system_prompt,
+                "prompt": prompt,
+                "params": params or {},
+            },
+            option=orjson.OPT_SORT_KEYS,
+        )
+        return hashlib.blake2b(payload, digest_size=16).digest()
 
-    def _get_cache(self, key: str) -> Optional[str]:
-        row = self._get_conn().execute(
-            "SELECT response_text FROM llm_cache WHERE cache_key = ?", (key,)
-        ).fetchone()
+    def _make_item_key(self, namespace: str, item_key: str) -> bytes:
+        payload = orjson.dumps(
+            {"model": self.model, "namespace": namespace, "item": item_key},
+            option=orjson.OPT_SORT_KEYS,
+        )
+        return hashlib.blake2b(payload, digest_size=16, person=b"llm-item").digest()
+
+    def _get_cache(self, key: bytes) -> Optional[str]:
+        pending = self._pending.get(key)   # queued, not yet committed
+        if pending is not None:
+            return pending[2]
+        conn = self._get_read_conn()
+        with self._read_lock:   # lookups are a single index probe, serializing is cheap
+            row = next(conn.execute(_SELECT_CACHE_ROW, (key,)), None)
         return row[0] if row else None
 
-    def _set_cache(self, key: str, response_text: str) -> None:
+    def _lookup_cache(
+        self, key: bytes, system_prompt: str, prompt: str, schema_version: str
+    ) -> Optional[str]:
+        """Cached response for ``key``, falling back to the pre-v2 table."""
+        cached = self._get_cache(key)
+        if cached is None and self._has_legacy_cache:
+            legacy_key = hashlib.sha256(
+                f"{self.model}||{schema_version}||{system_prompt}||{prompt}".encode()
+            ).hexdigest()
+            conn = self._get_read_conn()
+            with self._read_lock:
+                row = next(conn.execute(_SELECT_LEGACY_ROW, (legacy_key,)), None)
+            if row is not None:
+                cached = row[0]
+                self._set_cache(key, cached)   # promote to llm_cache_v2
+        return cached
+
+    def _set_cache(self, key: bytes, response_text: str) -> None:
+        row = (key, self.model, response_text, time.time())
+        with self._writer_lock:
+            self._pending[key] = row
+            if self._writer is None:
+                # Each writer owns its queue, so a flush never races a new writer
+                self._write_queue = queue.Queue()
+                self._writer = threading.Thread(
+                    target=self._cache_writer, args=(self._write_queue,),
+                    name="llm-cache-writer", daemon=True,
+                )
+                self._writer.start()
+            self._write_queue.put(row)
+
+    def _cache_writer(self, rows_queue: queue.Queue) -> None:
+        """Writer thread: commit queued cache rows in batches until a None sentinel."""
         conn = self._get_conn()
-        conn.execute(
-            "INSERT OR REPLACE INTO llm_cache (cache_key, model, response_text, created_at) "
-            "VALUES (?, ?, ?, ?)",
-            (key, self.model, response_text, time.time()),
-        )
-        conn.commit()
+        stop = False
+        while not stop:
+            row = rows_queue.get()
+            if row is None:
+                break
+            rows = [row]
+            deadline = time.monotonic() + _CACHE_FLUSH_INTERVAL
+            while len(rows) < _CACHE_FLUSH_MAX:
+                try:
+                    row = rows_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                rows.append(row)
+            try:
+                conn.executemany(_INSERT_CACHE_ROW, rows)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error("Failed to write %d LLM cache rows: %s", len(rows), e)
+            with self._writer_lock:
+                for r in rows:
+                    if self._pending.get(r[0]) is r:
+                        del self._pending[r[0]]
+        conn.close()
+        self._local.conn = None
+
+    def flush_cache(self) -> None:
+        """Block until all queued cache rows are committed."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                self._write_queue.put(None)
+        if writer is not None:
+            writer.join()
 
     def close(self):
+        self.flush_cache()
+        atexit.unregister(self.flush_cache)
+        if self._read_conn is not None:
+            self._read_conn.close()
+            self._read_conn = None
         # Close the main thread connection
         if hasattr(self._local, "conn") and self._local.conn:
             self._local.conn.close()
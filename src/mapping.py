@@ -3,13 +3,22 @@ Phase 4 — LLM-based account mapping to target positions.
 """
 from __future__ import annotations
 
-import json
+import hashlib
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Dict, List, Optional
 
+import numpy as np
+import orjson
 import pandas as pd
 
+try:
+    from rapidfuzz import fuzz, process
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    # ohne rapidfuzz nur exakte (normalisierte) Namensgleichheit
+    HAS_RAPIDFUZZ = False
+
+from .llm_client import call_concurrently
 from .targets import TargetPosition, targets_to_whitelist
 
 logger = logging.getLogger(__name__)
@@ -22,7 +31,7 @@ PROMPT_ACCOUNT_MAPPER = """You are a Lead Financial Auditor and LucaNet Implemen
 You are tasked with mapping a client's "Summen- und Saldenliste" (Trial Balance) to their standardized Group Chart of Accounts (LucaNet).
 
 ### INPUT CONTEXT
-- You will receive a **batch of accounts** from the trial balance.
+- You will receive a **batch of accounts** from the trial balance as `{"columns": [...], "rows": [[...], ...]}` — one row per account, values in the order of `columns`.
 - **Chart of Accounts Logic**: 
   - The client might use a standard frame (like SKR03/04) OR a **custom/proprietary** chart of accounts.
   - **CRITICAL**: Do NOT assume that the account order is logical. Accounts might be inserted randomly.
@@ -73,6 +82,107 @@ MAPPING_SCHEMA = {
 
 MAX_PARALLEL_BATCHES = 10
 
+# Accounts whose name matches exactly one target name with at least this
+# similarity (0-100) are mapped locally, without an LLM call
+LOCAL_MATCH_MIN_SCORE = 95
+
+# Smaller prompts answer faster; with few accounts the batches are shrunk
+# (down to MIN_BATCH_SIZE) so that all parallel slots are used.
+MIN_BATCH_SIZE = 10
+
+# Bump when prompt or schema change → invalidates prompt and per-account cache
+SCHEMA_VERSION = "mapping_v5_pro_prompt"
+
+# Row-marshaling: each batch is sent as one column header plus a list of
+# value rows, so the field names are not repeated for every account.
+BATCH_COLUMNS = ["konto_key", "konto_nr", "konto_name", "amount"]
+
+# String forms of missing values left behind by astype(str)
+_NULL_TEXTS = ("nan", "None", "NaN", "<NA>")
+
+# Fields of one LLM mapping result and the defaults for accounts without one
+_RESULT_FIELDS = ["konto_key", "target_id", "target_name", "target_class",
+                  "confidence", "rationale_short", "flags"]
+_RESULT_DEFAULTS = {"target_id": "UNMAPPED", "target_name": "", "target_class": "",
+                    "rationale_short": ""}
+
+
+def _account_keys(df: pd.DataFrame) -> pd.Series:
+    """konto_key per row: konto_nr as string ("nan" if missing), else the row label."""
+    if "konto_nr" not in df.columns:
+        return df.index.to_series(index=df.index).map(str)
+    return df["konto_nr"].map(str).where(df["konto_nr"].notna(), "nan")
+
+
+def _compact_whitelist(whitelist: List[Dict]) -> List[Dict]:
+    """Whitelist entries for the mapping prompt without repeated text.
+
+    hierarchy_path ends with the target's own name → only the parent path
+    is sent (as ``parent``, omitted for top-level positions).
+    """
+    compact = []
+    for entry in whitelist:
+        entry = dict(entry)
+        path = entry.pop("hierarchy_path", "") or ""
+        name = entry.get("target_name", "")
+        if path == name:
+            path = ""
+        elif path.endswith(" > " + name):
+            path = path[: -len(" > " + name)]
+        if path:
+            entry["parent"] = path
+        compact.append(entry)
+    return compact
+
+
+def _normalize_name(name: str) -> str:
+    return " ".join(name.split()).lower()
+
+
+def _local_name_matches(
+    items: List[list],
+    targets: List[TargetPosition],
+    min_score: float,
+) -> List[Dict]:
+    """Results for accounts whose name (nearly) equals the name of exactly one target.
+
+    Exact matches of the normalized names come from a dict lookup; with
+    rapidfuzz the rest is compared by ``fuzz.ratio`` (>= ``min_score``).
+    Names shared by several targets are ambiguous and left to the LLM.
+    """
+    by_name: Dict[str, List[TargetPosition]] = {}
+    for t in targets:
+        by_name.setdefault(_normalize_name(t.target_name), []).append(t)
+    unique = {name: ts[0] for name, ts in by_name.items() if name and len(ts) == 1}
+    if not unique:
+        return []
+    choices = list(unique)
+
+    results = []
+    for key, _, konto_name, _ in items:
+        name = _normalize_name(konto_name)
+        if not name:
+            continue
+        score = 100.0 if name in unique else None
+        match = name
+        if score is None and HAS_RAPIDFUZZ:
+            best = process.extractOne(name, choices, scorer=fuzz.ratio, score_cutoff=min_score)
+            if best is not None:
+                match, score = best[0], best[1]
+        if score is None:
+            continue
+        target = unique[match]
+        results.append({
+            "konto_key": key,
+            "target_id": target.target_id,
+            "target_name": target.target_name,
+            "target_class": target.target_class,
+            "confidence": round(score / 100, 2),
+            "rationale_short": f"Name entspricht Zielposition '{target.target_name}'",
+            "flags": ["local_name_match"],
+        })
+    return results
+
 
 def map_accounts(
     llm_client: Any,
@@ -80,106 +190,238 @@ def map_accounts(
     targets: List[TargetPosition],
     batch_size: int = 50,
     reasoning_effort: Optional[str] = None,
+    max_parallel: int = MAX_PARALLEL_BATCHES,
+    use_batch_api: bool = False,
+    use_cache: bool = True,
+    local_match_min_score: Optional[float] = LOCAL_MATCH_MIN_SCORE,
 ) -> pd.DataFrame:
-    """Map accounts to target positions using LLM."""
-    df = accounts_df.copy()
+    """Map accounts to target positions using LLM.
+
+    Up to ``batch_size`` accounts are packed into one prompt, up to
+    ``max_parallel`` prompts are in flight at the same time. If there are
+    fewer accounts than ``batch_size * max_parallel``, the batches shrink
+    (not below MIN_BATCH_SIZE) to spread the work over all parallel slots.
+    With ``use_batch_api`` all prompts go out as a single OpenAI Batch API job
+    instead (for non-interactive runs).
+
+    With ``use_cache`` (and a client that supports per-item results) accounts
+    already mapped against the same whitelist — keyed by konto_nr and
+    konto_name — are answered from the cache and not sent again.
+    ``use_cache=False`` also skips the lookup in the client's prompt-level cache.
+
+    Accounts whose name matches exactly one target name (similarity >=
+    ``local_match_min_score``) are mapped locally; ``None`` disables this.
+
+    ``accounts_df`` is not modified; a new DataFrame with the result columns
+    is returned.
+    """
+    # No defensive copy: accounts_df is only read, the result columns are
+    # attached with assign() which returns a new frame
+    df = accounts_df
     accounts_only = df[df["row_type"] == "ACCOUNT"]
 
     if accounts_only.empty:
         logger.warning("No ACCOUNT rows to map")
-        for col in ["target_overpos_id", "target_overpos_name", "target_class",
-                     "confidence", "rationale_short", "mapping_flags"]:
-            df[col] = ""
-        return df
+        return df.assign(**{
+            col: np.nan if col == "confidence" else ""
+            for col in ["target_overpos_id", "target_overpos_name", "target_class",
+                        "confidence", "rationale_short", "mapping_flags"]
+        })
 
-    whitelist = targets_to_whitelist(targets)
+    # Whitelist is identical for every batch → serialize once, not per prompt.
+    # One compact JSON object per target and line: still readable for the
+    # model, but without the indentation tokens of indent=1. The full list is
+    # sent (no per-batch shortlist): it is the cached prompt prefix, and a
+    # pruned list could drop the right target.
+    whitelist = _compact_whitelist(targets_to_whitelist(targets))
+    whitelist_json = "[\n" + ",\n".join(orjson.dumps(t).decode() for t in whitelist) + "\n]"
+    whitelist_header = f"## LucaNet Target Positions (Whitelist):\n{whitelist_json}\n\n"
+    # System prompt + whitelist are a byte-identical prefix of every batch
+    # prompt (the batch counter only goes to the log) → the provider's prompt
+    # cache serves it after the first batch. The key routes all batches of
+    # one whitelist to the same cache.
+    prompt_cache_key = "mapping-" + hashlib.blake2b(
+        whitelist_header.encode(), digest_size=16
+    ).hexdigest()
 
-    # Prepare items for batching
+    # Prepare items for batching — one row per account in BATCH_COLUMNS order,
+    # built column-wise. Missing numbers/names are sent as "".
     # We send the accounts in their original order (sorted by extraction)
     # This preserves the natural "Block" context for the LLM.
-    items = []
-    for idx, row in accounts_only.iterrows():
-        items.append({
-            "konto_key": f"{row.get('konto_nr', idx)}", 
-            "konto_nr": str(row.get("konto_nr", "")),
-            "konto_name": str(row.get("konto_name", "")),
-            "amount": row.get("amount_normalized"),
-            # No manual context/heuristics - rely on LLM reading the batch natively
-        })
+    keys = _account_keys(df)
+    is_account = (df["row_type"] == "ACCOUNT").to_numpy()
+
+    # Each konto_key is sent once per run: the merge below broadcasts one
+    # result to all rows with that key anyway (e.g. the same account on
+    # several period sheets), so repeats would only cost tokens.
+    first_seen = ~keys[is_account].duplicated().to_numpy()
+    unique_accounts = accounts_only[first_seen]
+    unique_keys = keys[is_account][first_seen]
+
+    def _text(col: str) -> list:
+        if col not in unique_accounts.columns:
+            return [""] * len(unique_accounts)
+        values = unique_accounts[col]
+        text = values.map(str).where(values.notna(), "")
+        # Upstream astype(str) turns missing cells into "nan"/"None" literals
+        return text.mask(text.str.strip().isin(_NULL_TEXTS), "").tolist()
+
+    amounts = (
+        unique_accounts["amount_normalized"].tolist()
+        if "amount_normalized" in unique_accounts.columns
+        else [None] * len(unique_accounts)
+    )
+    items = [
+        list(row)
+        for row in zip(unique_keys.tolist(), _text("konto_nr"), _text("konto_name"), amounts)
+    ]
+    if len(items) < len(accounts_only):
+        logger.info("%d Kontozeilen, %d eindeutige Konten", len(accounts_only), len(items))
+
+    # Konten ohne verwertbaren Namen (leer oder nur Ziffern/Satzzeichen)
+    # bleiben ohne LLM-Aufruf UNMAPPED
+    local_results: List[Dict] = [
+        {
+            "konto_key": item[0],
+            "target_id": "UNMAPPED",
+            "confidence": 0.0,
+            "rationale_short": "Kein verwertbarer Kontoname",
+            "flags": ["empty_name"],
+        }
+        for item in items if not any(ch.isalpha() for ch in item[2])
+    ]
+    if local_results:
+        nameless = {r["konto_key"] for r in local_results}
+        items = [item for item in items if item[0] not in nameless]
+        logger.info("%d Konten ohne Namen → UNMAPPED", len(local_results))
+
+    # Eindeutige Namenstreffer brauchen kein LLM
+    if local_match_min_score is not None:
+        name_matches = _local_name_matches(items, targets, local_match_min_score)
+        local_results += name_matches
+        if name_matches:
+            matched = {r["konto_key"] for r in name_matches}
+            items = [item for item in items if item[0] not in matched]
+            logger.info("Lokale Namenstreffer: %d Konten ohne LLM gemappt", len(name_matches))
+
+    # Konten, die schon einmal gegen dieselbe Whitelist gemappt wurden, kommen
+    # aus dem Cache (Schlüssel: konto_nr + konto_name, unabhängig vom Batch)
+    cached_results: List[Dict] = []
+    item_keys: Dict[str, str] = {}
+    cache_namespace = f"{prompt_cache_key}|{SCHEMA_VERSION}|{reasoning_effort}"
+    use_item_cache = use_cache and hasattr(llm_client, "get_item_results")
+    if use_item_cache:
+        item_keys = {item[0]: f"{item[1]}|{item[2].strip().lower()}" for item in items}
+        hits = llm_client.get_item_results(cache_namespace, list(item_keys.values()))
+        cached_results = [
+            {**hits[item_keys[item[0]]], "konto_key": item[0]}
+            for item in items if item_keys[item[0]] in hits
+        ]
+        items = [item for item in items if item_keys[item[0]] not in hits]
+        logger.info("Mapping-Cache: %d Konten aus dem Cache, %d an das LLM",
+                    len(cached_results), len(items))
 
     # Batch map — alle Batches parallel senden (max MAX_PARALLEL_BATCHES gleichzeitig)
+    if not use_batch_api and items:
+        per_slot = -(-len(items) // max(1, max_parallel))
+        batch_size = min(batch_size, max(MIN_BATCH_SIZE, per_slot))
     n_batches = (len(items) + batch_size - 1) // batch_size
+    if n_batches:
+        batch_size = -(-len(items) // n_batches)   # gleich große Batches, kein Mini-Rest
     batches = [
         (batch_idx, items[i:i + batch_size])
         for batch_idx, i in enumerate(range(0, len(items), batch_size), start=1)
     ]
 
-    def _call_batch(batch_idx: int, batch: List[Dict]) -> tuple[int, List[Dict]]:
+    def _build_request(batch_idx: int, batch: List[list]) -> Dict[str, Any]:
+        logger.info("Mapping batch %d/%d (%d accounts)", batch_idx, n_batches, len(batch))
+        batch_rows = {
+            "columns": BATCH_COLUMNS,
+            "rows": batch,
+        }
         prompt = (
-            f"## LucaNet Target Positions (Whitelist):\n"
-            f"{json.dumps(whitelist, ensure_ascii=False, indent=1)}\n\n"
-            f"## Trial Balance Accounts (Batch {batch_idx}/{n_batches}):\n"
-            f"{json.dumps(batch, ensure_ascii=False, indent=1)}\n\n"
+            f"{whitelist_header}"
+            "## Trial Balance Accounts (one row per account):\n"
+            f"{orjson.dumps(batch_rows).decode()}\n\n"
             "Task: Map the accounts above to the Target Positions."
         )
-        logger.info("Mapping batch %d/%d (%d accounts) — parallel ...", batch_idx, n_batches, len(batch))
-        result = llm_client.call(
+        return dict(
             prompt=prompt,
             system_prompt=PROMPT_ACCOUNT_MAPPER,
             json_schema=MAPPING_SCHEMA,
             temperature=0.0,
-            schema_version="mapping_v5_pro_prompt",
+            schema_version=SCHEMA_VERSION,
             reasoning_effort=reasoning_effort,
+            prompt_cache_key=prompt_cache_key,
+            use_cache=use_cache,
         )
+
+    def _batch_results(batch_idx: int, result: Any) -> List[Dict]:
+        if isinstance(result, Exception):
+            # Ein fehlgeschlagener Batch bleibt UNMAPPED, die übrigen werden übernommen
+            logger.error("Batch %d/%d fehlgeschlagen: %s", batch_idx, n_batches, result)
+            return []
         if isinstance(result, dict) and "results" in result:
-            return batch_idx, result["results"]
+            return result["results"]
         logger.error("Batch %d/%d: kein Ergebnis", batch_idx, n_batches)
-        return batch_idx, []
-
-    workers = min(MAX_PARALLEL_BATCHES, n_batches)
-    logger.info("Sende %d Batches parallel (%d Worker) ...", n_batches, workers)
-    batch_results: Dict[int, List[Dict]] = {}
-    with ThreadPoolExecutor(max_workers=workers) as pool:
-        futures = {pool.submit(_call_batch, idx, batch): idx for idx, batch in batches}
-        for future in as_completed(futures):
-            batch_idx, res = future.result()
-            batch_results[batch_idx] = res
-            logger.info("Batch %d/%d fertig (%d Ergebnisse)", batch_idx, n_batches, len(res))
+        return []
+
+    requests = [_build_request(idx, batch) for idx, batch in batches]
+    if not requests:
+        responses = []
+    elif use_batch_api:
+        # Offline-Lauf: alle Batches als ein Batch-API-Job (halber Preis, kein RPM-Limit)
+        logger.info("Sende %d Batches über die Batch API ...", n_batches)
+        responses = llm_client.call_batch_api(requests)
+    else:
+        logger.info("Sende %d Batches parallel (max. %d gleichzeitig) ...", n_batches, max_parallel)
+        responses = call_concurrently(llm_client, requests, max_parallel, return_exceptions=True)
 
     # Ergebnisse in Original-Batch-Reihenfolge zusammenführen
     all_results: List[Dict] = []
-    for idx in sorted(batch_results):
-        all_results.extend(batch_results[idx])
+    for (idx, _), result in zip(batches, responses):
+        all_results.extend(_batch_results(idx, result))
 
-    # Merge results into DataFrame
-    result_map = {r["konto_key"]: r for r in all_results}
+    if use_item_cache:
+        fresh = {
+            item_keys[r["konto_key"]]: {k: v for k, v in r.items() if k != "konto_key"}
+            for r in all_results
+            if isinstance(r, dict) and isinstance(r.get("konto_key"), str)
+            and r["konto_key"] in item_keys
+        }
+        llm_client.set_item_results(cache_namespace, fresh)
+    all_results = local_results + cached_results + all_results
+
+    # Merge results into DataFrame — one reindex of the result table on the
+    # account keys instead of a per-row dict lookup
+    results = [r for r in all_results if isinstance(r, dict) and "konto_key" in r]
+    results_df = (
+        pd.DataFrame.from_records(results, columns=_RESULT_FIELDS)
+        .drop_duplicates("konto_key", keep="last")
+        .set_index("konto_key")
+    )
+
+    looked_up = results_df.reindex(keys[is_account])
 
-    mapping_cols = {
-        "target_overpos_id": [], "target_overpos_name": [], "target_class": [],
-        "confidence": [], "rationale_short": [], "mapping_flags": [],
+    def _column(values: Any, fill: Any) -> np.ndarray:
+        out = np.full(len(df), fill, dtype=object if isinstance(fill, str) else float)
+        out[is_account] = values
+        return out
+
+    text = {
+        field: looked_up[field].fillna(default).to_numpy()
+        for field, default in _RESULT_DEFAULTS.items()
     }
+    # confidence stays numeric (NaN for non-account rows) so it can be ranked
+    confidence = pd.to_numeric(looked_up["confidence"], errors="coerce").fillna(0.0)
+    flags = [orjson.dumps(f if isinstance(f, list) else []).decode() for f in looked_up["flags"]]
 
-    for idx, row in df.iterrows():
-        if row["row_type"] != "ACCOUNT":
-            for col in mapping_cols: mapping_cols[col].append("")
-            continue
-            
-        # Use the same key generation logic as above
-        nr_as_key = str(row.get("konto_nr", idx))
-        
-        # Try finding by explicit key first, fallback to Nr if implicit
-        r = result_map.get(nr_as_key, {})
-        if not r and "konto_nr" in row:
-             r = result_map.get(str(row["konto_nr"]), {})
-
-        mapping_cols["target_overpos_id"].append(r.get("target_id", "UNMAPPED"))
-        mapping_cols["target_overpos_name"].append(r.get("target_name", ""))
-        mapping_cols["target_class"].append(r.get("target_class", ""))
-        mapping_cols["confidence"].append(r.get("confidence", 0.0))
-        mapping_cols["rationale_short"].append(r.get("rationale_short", ""))
-        mapping_cols["mapping_flags"].append(json.dumps(r.get("flags", [])))
-
-    for col, vals in mapping_cols.items():
-        df[col] = vals
-
-    return df
+    # All six result columns in one assign instead of six column inserts
+    return df.assign(
+        target_overpos_id=_column(text["target_id"], ""),
+        target_overpos_name=_column(text["target_name"], ""),
+        target_class=_column(text["target_class"], ""),
+        confidence=_column(confidence.to_numpy(), np.nan),
+        rationale_short=_column(text["rationale_short"], ""),
+        mapping_flags=_column(flags, ""),
+    )
@@ -6,13 +6,23 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 from pydantic import BaseModel, Field
 
-from .io_readers import parse_number
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    # ohne pyahocorasick: eine Regex-Alternation pro Keyword-Liste
+    HAS_AHOCORASICK = False
+
+from .io_readers import (
+    detect_column_locale, locale_conflict_mask, parse_number, parse_number_series,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +48,11 @@ class RowClassificationRules(BaseModel):
     sign_column_rule: str = "none"
     language: str = "de"
 
+
+# Built once; pydantic copies the lists into every new rules object
+_DEFAULT_RULES = RowClassificationRules()
+
+
 def rules_from_detection(detection: Any) -> RowClassificationRules:
     """Build RowClassificationRules from a Phase 1 TableDetection result.
 
@@ -45,7 +60,7 @@ def rules_from_detection(detection: Any) -> RowClassificationRules:
     that Phase 1 already provides.
     """
     hints = detection.row_type_hints if hasattr(detection, "row_type_hints") else {}
-    defaults = RowClassificationRules()
+    defaults = _DEFAULT_RULES
 
     return RowClassificationRules(
         total_keywords=hints.get("total_keywords", defaults.total_keywords),
@@ -59,85 +74,143 @@ def rules_from_detection(detection: Any) -> RowClassificationRules:
 
 
 
-def apply_classification(
-    df: pd.DataFrame,
-    rules: RowClassificationRules,
-) -> pd.DataFrame:
-    """Apply row classification rules to the extracted DataFrame."""
-    df = df.copy()
-    row_types = []
-
-    konto_nr_col = "konto_nr" if "konto_nr" in df.columns else None
-    konto_name_col = "konto_name" if "konto_name" in df.columns else None
-
-    for idx, row in df.iterrows():
-        konto_nr = str(row.get("konto_nr", "")).strip() if konto_nr_col else ""
-        konto_name = str(row.get("konto_name", "")).strip() if konto_name_col else ""
-        combined_text = f"{konto_nr} {konto_name}".lower()
-
-        # Check noise first
-        is_noise = False
-        for pattern in rules.noise_patterns:
-            try:
-                if re.match(pattern, combined_text.strip()):
-                    is_noise = True
-                    break
-            except re.error:
-                pass
-        if is_noise or (not konto_nr and not konto_name):
-            row_types.append("NOISE")
-            continue
-
-        # PRIORITY RULE: If the row has a valid account number, it IS an account.
-        # Keywords in the account name (like "Soll", "Haben", "Summe" etc.)
-        # should NOT override the account classification.
-        has_valid_acct_nr = False
+# side_indicator values (stripped, upper-case) that force the amount's sign
+_CREDIT_INDICATORS = frozenset({"H", "HABEN", "C", "CREDIT", "CR"})
+_DEBIT_INDICATORS = frozenset({"S", "SOLL", "D", "DEBIT", "DR"})
+
+# Categories of the row_type column, in classification priority order
+ROW_TYPES = ["NOISE", "ACCOUNT", "CALCULATED_RESULT", "TOTAL", "HEADER"]
+
+# Keywords that turn a TOTAL row into a CALCULATED_RESULT
+_RESULT_KEYWORDS = [
+    "jahresüberschuss", "jahresfehlbetrag", "ergebnis", "net income",
+    "profit", "loss", "result", "gewinn", "verlust",
+]
+
+
+_LEADING_DIGITS_RE = re.compile(r"^\d+")
+
+
+@lru_cache(maxsize=64)
+def _compile_patterns(patterns: tuple) -> tuple:
+    """Compile rule patterns once per distinct set; invalid ones are dropped."""
+    compiled = []
+    for pattern in patterns:
         try:
-            if konto_nr and re.match(rules.account_number_pattern, konto_nr):
-                has_valid_acct_nr = True
-            elif konto_nr and re.match(r"^\d+", konto_nr):
-                has_valid_acct_nr = True
+            compiled.append(re.compile(pattern))
         except re.error:
-            if konto_nr and konto_nr.isdigit():
-                has_valid_acct_nr = True
+            logger.debug("Ignoring invalid pattern %r", pattern)
+    return tuple(compiled)
 
-        if has_valid_acct_nr:
-            row_types.append("ACCOUNT")
-            continue
 
-        # --- Only for rows WITHOUT a valid account number: check keywords ---
+@lru_cache(maxsize=64)
+def _noise_regexes(patterns: tuple) -> tuple:
+    """Noise patterns folded into one alternation where possible.
+
+    Patterns with groups keep their own regex (backreference numbers would
+    shift in the union); if the union does not compile, e.g. because of an
+    inline flag like "(?i)", every pattern is matched separately.
+    """
+    compiled = _compile_patterns(patterns)
+    simple = [c for c in compiled if not c.groups]
+    grouped = [c for c in compiled if c.groups]
+    if len(simple) > 1:
+        try:
+            simple = [re.compile("|".join(f"(?:{c.pattern})" for c in simple))]
+        except re.error:
+            pass
+    return tuple(simple + grouped)
+
+
+def _text_column(df: pd.DataFrame, col: str) -> pd.Series:
+    """Column as stripped Python strings (str(v), i.e. "nan" for NaN); "" if missing.
+
+    Object dtype on purpose: the .str methods then use Python's re and
+    str semantics (Unicode \\d, user-supplied patterns) like the old per-row
+    code, instead of the Arrow regex engine.
+    """
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].map(str).astype(object).str.strip()
 
-        # Check totals
-        is_total = False
-        for kw in rules.total_keywords:
-            if kw.lower() in combined_text:
-                is_total = True
-                break
-        if is_total:
-            # Distinguish TOTAL from CALCULATED_RESULT
-            result_keywords = [
-                "jahresüberschuss", "jahresfehlbetrag", "ergebnis", "net income",
-                "profit", "loss", "result", "gewinn", "verlust",
-            ]
-            is_result = any(rk in combined_text for rk in result_keywords)
-            row_types.append("CALCULATED_RESULT" if is_result else "TOTAL")
-            continue
-
-        # Check headers
-        is_header = False
-        for kw in rules.header_keywords:
-            if kw.lower() in combined_text:
-                is_header = True
-                break
-        if is_header:
-            row_types.append("HEADER")
-            continue
 
-        # No account number and no keyword match → treat as HEADER
-        row_types.append("HEADER")
+def _keyword_mask(text: pd.Series, keywords: List[str]) -> pd.Series:
+    """True where ``text`` contains any of ``keywords`` (substring, lower-case)."""
+    keywords = tuple(kw.lower() for kw in keywords)
+    if not keywords or "" in keywords:
+        return pd.Series(bool(keywords), index=text.index, dtype=bool)
+    if HAS_AHOCORASICK:
+        # One automaton pass per row instead of trying every keyword
+        automaton = _keyword_automaton(keywords)
+        return pd.Series(
+            [next(automaton.iter(t), None) is not None for t in text],
+            index=text.index, dtype=bool,
+        )
+    return text.str.contains(_keyword_regex(keywords), na=False)
 
-    df["row_type"] = row_types
-    return df
+
+@lru_cache(maxsize=64)
+def _keyword_automaton(keywords: tuple):
+    automaton = ahocorasick.Automaton()
+    for kw in keywords:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+
+@lru_cache(maxsize=64)
+def _keyword_regex(keywords: tuple) -> re.Pattern:
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+
+def apply_classification(
+    df: pd.DataFrame,
+    rules: RowClassificationRules,
+) -> pd.DataFrame:
+    """Apply row classification rules to the extracted DataFrame.
+
+    Column-wise: one mask per rule, combined with np.select in priority
+    order NOISE > ACCOUNT > CALCULATED_RESULT / TOTAL > HEADER.
+    """
+    konto_nr = _text_column(df, "konto_nr")
+    konto_name = _text_column(df, "konto_name")
+    combined_text = (konto_nr + " " + konto_name).str.lower()
+    stripped = combined_text.str.strip()
+
+    # Check noise first (invalid patterns are skipped)
+    is_noise = (konto_nr == "") & (konto_name == "")
+    for compiled in _noise_regexes(tuple(rules.noise_patterns)):
+        is_noise |= stripped.str.match(compiled, na=False)
+
+    # PRIORITY RULE: If the row has a valid account number, it IS an account.
+    # Keywords in the account name (like "Soll", "Haben", "Summe" etc.)
+    # should NOT override the account classification.
+    has_nr = konto_nr != ""
+    acct_res = _compile_patterns((rules.account_number_pattern,))
+    if not acct_res:
+        has_valid_acct_nr = has_nr & konto_nr.str.isdigit()
+    else:
+        has_valid_acct_nr = has_nr & (
+            konto_nr.str.match(acct_res[0], na=False)
+            | konto_nr.str.match(_LEADING_DIGITS_RE, na=False)
+        )
+
+    # --- Only for rows WITHOUT a valid account number: check keywords ---
+    # Header keywords need no mask: rows without account number and without
+    # total keyword are HEADER either way.
+    is_total = _keyword_mask(combined_text, rules.total_keywords)
+    is_result = is_total & _keyword_mask(combined_text, _RESULT_KEYWORDS)
+
+    # Codes into ROW_TYPES (HEADER is the default) → categorical, no str per row
+    codes = np.select(
+        [is_noise.to_numpy(), has_valid_acct_nr.to_numpy(),
+         is_result.to_numpy(), is_total.to_numpy()],
+        [0, 1, 2, 3],
+        default=4,
+    ).astype(np.int8)
+    row_type = pd.Categorical.from_codes(codes, ROW_TYPES)
+    # assign() returns a new frame sharing the existing columns (no deep copy)
+    return df.assign(row_type=row_type)
 
 
 def normalize_amounts(
@@ -147,93 +220,148 @@ def normalize_amounts(
     language_hint: str = "de",
 ) -> pd.DataFrame:
     """Compute amount_normalized based on strategy."""
-    df = df.copy()
+    kind, arg = _parse_strategy(strategy)
     locale = "de" if language_hint in ("de", "nl", "ro") else "en"
 
-    amount_normalized = []
-    amount_basis_list = []
-
-    for idx, row in df.iterrows():
-        val = None
-        basis = strategy
-
-        if strategy.startswith("use_column:"):
-            col_name = strategy.replace("use_column:", "")
-            # Try exact match
-            if col_name in row.index:
-                val = parse_number(str(row[col_name]), locale)
-                basis = f"column: {col_name}"
-            else:
-                # Try amount_ prefix
-                prefixed = f"amount_{col_name}"
-                if prefixed in row.index:
-                    val = parse_number(str(row[prefixed]), locale)
-                    basis = f"column: {prefixed}"
-
-        elif strategy.startswith("computed:"):
-            formula = strategy.replace("computed:", "")
-            if "begin+debit-credit" in formula:
-                begin = _get_amount(row, ["amount_begin_balance", "amount_begin"], locale)
-                debit = _get_amount(row, ["amount_debit", "amount_soll"], locale)
-                credit = _get_amount(row, ["amount_credit", "amount_haben"], locale)
-                begin = begin or 0.0
-                debit = debit or 0.0
-                credit = credit or 0.0
-                val = begin + debit - credit
-                basis = "computed: begin + debit - credit"
-            elif "debit-credit" in formula:
-                debit = _get_amount(row, ["amount_debit", "amount_soll"], locale)
-                credit = _get_amount(row, ["amount_credit", "amount_haben"], locale)
-                debit = debit or 0.0
-                credit = credit or 0.0
-                val = debit - credit
-                basis = "computed: debit - credit"
-
-        # Fallback: try common amount columns
-        if val is None:
-            for candidate in [
-                "amount_end_balance", "amount_closing_balance", "amount_saldo",
-                "amount_kum_saldo", "amount_endsaldo", "amount_balance",
-            ]:
-                if candidate in row.index:
-                    val = parse_number(str(row[candidate]), locale)
-                    if val is not None:
-                        basis = f"column: {candidate}"
-                        break
-
-        # Last resort: try any amount_ column
-        if val is None:
-            for col in row.index:
-                if col.startswith("amount_") and col != "amount_raw":
-                    val = parse_number(str(row[col]), locale)
-                    if val is not None:
-                        basis = f"column: {col}"
-                        break
-
-        # Handle side indicator
-        if val is not None and "side_indicator" in row.index:
-            indicator = str(row.get("side_indicator", "")).strip().upper()
-            if indicator in ("H", "HABEN", "C", "CREDIT", "CR"):
-                val = -abs(val)
-            elif indicator in ("S", "SOLL", "D", "DEBIT", "DR"):
-                val = abs(val)
-
-        amount_normalized.append(val)
-        amount_basis_list.append(basis)
-
-    df["amount_normalized"] = amount_normalized
-    df["amount_basis"] = amount_basis_list
-    return df
-
-
-def _get_amount(row: pd.Series, candidates: List[str], locale: str) -> Optional[float]:
-    """Try to get a parsed amount from multiple candidate column names."""
+    # Zahlenformat einmal pro Spalte bestimmen (language_hint nur als Default):
+    # numerische Excel-Zellen kommen als "1234.5" an, auch in deutschen SuSas.
+    # Spaltenmengen einmal vorab statt Lookups auf df.columns
+    present = set(df.columns)
+    amount_cols = [c for c in df.columns if str(c).startswith("amount_")]
+    last_resort = [c for c in amount_cols if c != "amount_raw"]
+    locale_cols = list(amount_cols)
+    if kind == "use_column":
+        locale_cols.append(arg)
+    locales = {
+        col: detect_column_locale(df[col], default=locale)
+        for col in dict.fromkeys(locale_cols) if col in present
+    }
+
+    # Jede benötigte Spalte genau einmal parsen, dann zeilenweise Auswahl per Maske
+    parsed: Dict[str, tuple] = {}
+
+    def column(col: str) -> tuple:
+        if col not in parsed:
+            parsed[col] = _parse_amount_column(df[col], locales.get(col, locale))
+        return parsed[col]
+
+    n = len(df)
+    val = np.full(n, np.nan)
+    found = np.zeros(n, dtype=bool)     # False == parse_number returned None
+    basis = np.full(n, strategy, dtype=object)
+
+    if kind == "use_column":
+        # Try exact match, then amount_ prefix
+        for col in (arg, f"amount_{arg}"):
+            if col in present:
+                val, found = column(col)
+                basis[:] = f"column: {col}"
+                break
+
+    elif kind == "computed":
+        if "begin+debit-credit" in arg:
+            begin = _first_amount(column, present, ["amount_begin_balance", "amount_begin"], n)
+            debit = _first_amount(column, present, ["amount_debit", "amount_soll"], n)
+            credit = _first_amount(column, present, ["amount_credit", "amount_haben"], n)
+            val = begin + debit - credit
+            found = np.ones(n, dtype=bool)
+            basis[:] = "computed: begin + debit - credit"
+        elif "debit-credit" in arg:
+            debit = _first_amount(column, present, ["amount_debit", "amount_soll"], n)
+            credit = _first_amount(column, present, ["amount_credit", "amount_haben"], n)
+            val = debit - credit
+            found = np.ones(n, dtype=bool)
+            basis[:] = "computed: debit - credit"
+
+    # Arrays from column() are cached and shared — never modify them in place
+    val = val.copy()
+    found = found.copy()
+
+    # Fallback: try common amount columns, then any amount_ column (last resort)
+    fallback = [
+        "amount_end_balance", "amount_closing_balance", "amount_saldo",
+        "amount_kum_saldo", "amount_endsaldo", "amount_balance",
+    ]
+    for candidates in (fallback, last_resort):
+        for col in candidates:
+            if found.all():
+                break
+            if col not in present:
+                continue
+            col_val, col_found = column(col)
+            take = ~found & col_found
+            val[take] = col_val[take]
+            basis[take] = f"column: {col}"
+            found |= take
+
+    # Handle side indicator
+    if "side_indicator" in present:
+        indicator = df["side_indicator"].map(str).astype(object).str.strip().str.upper()
+        is_credit = indicator.isin(_CREDIT_INDICATORS).to_numpy() & found
+        is_debit = indicator.isin(_DEBIT_INDICATORS).to_numpy() & found
+        val[is_credit] = -np.abs(val[is_credit])
+        val[is_debit] = np.abs(val[is_debit])
+
+    # None (nicht NaN) wo nichts gefunden wurde — wie bisher
+    return df.assign(
+        amount_normalized=np.where(found, val, None).tolist(),
+        amount_basis=basis.tolist(),
+    )
+
+
+def _parse_strategy(strategy: str) -> Tuple[str, str]:
+    """Split "use_column:<col>" / "computed:<formula>" once → (kind, argument).
+
+    Any other strategy (e.g. "end_balance") only uses the fallback chain.
+    """
+    for kind in ("use_column", "computed"):
+        if strategy.startswith(kind + ":"):
+            return kind, strategy[len(kind) + 1:]
+    return "", ""
+
+
+def _parse_amount_column(values: pd.Series, locale: str) -> tuple:
+    """``parse_number(str(v), locale)`` for a whole column → (values, found).
+
+    ``found`` is False where the scalar parser returns None (fallback goes on);
+    a literal "nan" cell parses to NaN and counts as found, like before.
+    """
+    if isinstance(values.dtype, pd.StringDtype) and values.dtype.na_value is np.nan:
+        # Sheet columns: str(v) is v itself, missing cells become "nan".
+        # Stays in Arrow compute (releases the GIL for the parallel sheet workers).
+        text = values.fillna("nan")
+    else:
+        text = values.map(str).astype(object)
+    parsed = parse_number_series(text, locale).to_numpy(dtype="float64")
+    # Die Spalten-Locale gilt nur für mehrdeutige Werte: eindeutig anders
+    # formatierte Zellen ("2.500,00" in einer "en"-Spalte) behalten ihr Format
+    conflict = locale_conflict_mask(text, locale)
+    if conflict.any():
+        other = "en" if locale == "de" else "de"
+        parsed = parsed.copy()   # to_numpy may hand out a read-only view
+        parsed[conflict] = parse_number_series(text[conflict], other).to_numpy(dtype="float64")
+    found = ~np.isnan(parsed)
+    missing = ~found
+    if missing.any():
+        # Only NaN results are ambiguous — resolve them once per distinct text
+        odd = text[missing]
+        lookup = {t: parse_number(t, locale) is not None for t in odd.unique()}
+        found[missing] = odd.map(lookup).to_numpy(dtype=bool)
+    return parsed, found
+
+
+def _first_amount(column, columns, candidates: List[str], n: int) -> np.ndarray:
+    """First parsed amount per row among ``candidates``; 0.0 where none (``x or 0.0``)."""
+    val = np.full(n, np.nan)
+    found = np.zeros(n, dtype=bool)
     for col in candidates:
-        if col in row.index:
-            val = parse_number(str(row[col]), locale)
-            if val is not None:
-                return val
-    return None
+        if col in columns:
+            col_val, col_found = column(col)
+            take = ~found & col_found
+            val[take] = col_val[take]
+            found |= take
+    # `x or 0.0`: None and ±0.0 become 0.0, NaN stays NaN
+    return np.where(found & (val != 0), val, 0.0)
 
 
 def deduplicate_accounts(df: pd.DataFrame) -> pd.DataFrame:
@@ -241,7 +369,6 @@ def deduplicate_accounts(df: pd.DataFrame) -> pd.DataFrame:
     Disabled deduplication: returns all detected account rows as separate entries.
     Flags each row with an empty flag list.
     """
-    df = df.copy()
     if "flags" not in df.columns:
-        df["flags"] = "[]"
-    return df
+        return df.assign(flags="[]")
+    return df.copy(deep=False)
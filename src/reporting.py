@@ -1,13 +1,17 @@
 """
-Reporting — Generate report.md, report.json, and optional review.csv.
+Reporting — Generate report.md, report.json, optional review.csv and the mapping table.
 """
 from __future__ import annotations
 
+import codecs
 import json
 from pathlib import Path
 from typing import Any, Dict
 
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
 
 def generate_report(
@@ -42,31 +46,34 @@ def generate_report(
         },
         "sign_convention": sign_info,
     }
-    (output_dir / "report.json").write_text(
-        json.dumps(report_data, indent=2, ensure_ascii=False, default=str), encoding="utf-8"
-    )
+    # orjson liefert direkt UTF-8-Bytes (kein zweiter Encode-Durchlauf)
+    (output_dir / "report.json").write_bytes(orjson.dumps(
+        report_data,
+        default=str,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    ))
 
     # --- report.md ---
     md = [
         "# SuSa → LucaNet Mapping Report\n",
-        f"## Summary\n",
+        "## Summary\n",
         f"- **Accounts mapped**: {len(accounts)}",
         f"- **Total/Subtotal rows removed**: {len(totals_removed)}",
         f"- **Unmapped accounts**: {checks.get('unmapped_count', 0)}",
         f"- **Low confidence (< 0.5)**: {checks.get('low_confidence_count', 0)}\n",
-        f"## Balance Check (Bilanz)\n",
-        f"| | Amount |",
-        f"|---|---:|",
+        "## Balance Check (Bilanz)\n",
+        "| | Amount |",
+        "|---|---:|",
         f"| Aktiva | {checks.get('aktiva_sum', 0):,.2f} |",
         f"| Passiva | {checks.get('passiva_sum', 0):,.2f} |",
         f"| **Differenz** | **{checks.get('balance_diff', 0):,.2f}** ({checks.get('balance_diff_pct', 0):.1f}%) |\n",
-        f"## GuV Check\n",
-        f"| | Amount |",
-        f"|---|---:|",
+        "## GuV Check\n",
+        "| | Amount |",
+        "|---|---:|",
         f"| Ertrag | {checks.get('ertrag_sum', 0):,.2f} |",
         f"| Aufwand | {checks.get('aufwand_sum', 0):,.2f} |",
         f"| **Ergebnis** | **{checks.get('guv_result', 0):,.2f}** |\n",
-        f"## Sign Convention\n",
+        "## Sign Convention\n",
         f"- Confidence: {sign_info.get('confidence', 'N/A')}",
         f"- Convention: {json.dumps(sign_info.get('convention', {}), ensure_ascii=False)}",
         f"- Notes: {sign_info.get('notes', 'N/A')}\n",
@@ -79,14 +86,17 @@ def generate_report(
             md.append("## Top Risk Accounts (lowest confidence)\n")
             md.append("| Konto | Name | Target | Confidence |")
             md.append("|---|---|---|---:|")
-            for _, r in risky.iterrows():
-                md.append(
-                    f"| {r.get('konto_nr', '')} | {str(r.get('konto_name', ''))[:40]} "
-                    f"| {str(r.get('target_overpos_name', ''))[:30]} | {r.get('confidence', 0):.2f} |"
-                )
+            rows = risky.reindex(
+                columns=["konto_nr", "konto_name", "target_overpos_name", "confidence"],
+                fill_value="",
+            )
+            md.extend(
+                f"| {nr} | {str(name)[:40]} | {str(target)[:30]} | {conf:.2f} |"
+                for nr, name, target, conf in rows.itertuples(index=False, name=None)
+            )
             md.append("")
 
-    (output_dir / "report.md").write_text("\n".join(md), encoding="utf-8")
+    (output_dir / "report.md").write_bytes("\n".join(md).encode("utf-8"))
 
     # --- review.csv (optional) ---
     if not accounts.empty:
@@ -94,4 +104,52 @@ def generate_report(
                        "target_overpos_name", "target_class", "confidence",
                        "rationale_short", "amount_normalized"]
         available = [c for c in review_cols if c in accounts.columns]
-        accounts[available].to_csv(output_dir / "review.csv", index=False, encoding="utf-8-sig")
+        _write_review_csv(accounts[available], output_dir / "review.csv")
+
+
+def _write_review_csv(df: pd.DataFrame, path: Path) -> None:
+    """review.csv via Arrow's C++ CSV writer, UTF-8 with BOM for Excel.
+
+    Columns Arrow cannot type (mixed objects) fall back to pandas' writer.
+    """
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+        return
+    with open(path, "wb") as f:
+        f.write(codecs.BOM_UTF8)
+        pacsv.write_csv(table, f)
+
+
+def write_mapping(
+    mapping_df: pd.DataFrame,
+    output_dir: str | Path,
+    emit_csv: bool = False,
+) -> Path:
+    """Write the full mapping table as mapping.parquet (and mapping.csv if emit_csv)."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Arrow needs one type per column. Mixed object columns (e.g. confidence:
+    # "" for non-account rows, floats for accounts) become numeric if all
+    # non-empty values are numbers, otherwise strings.
+    out = mapping_df
+    for col in mapping_df.columns[mapping_df.dtypes == object]:
+        if not pd.api.types.infer_dtype(mapping_df[col], skipna=True).startswith("mixed"):
+            continue
+        values = mapping_df[col].replace("", None)
+        numeric = pd.to_numeric(values, errors="coerce")
+        if out is mapping_df:
+            out = mapping_df.copy(deep=False)
+        if numeric.notna().sum() == values.notna().sum():
+            out[col] = numeric
+        else:
+            out[col] = mapping_df[col].where(mapping_df[col].isna(), mapping_df[col].astype(str))
+
+    path = output_dir / "mapping.parquet"
+    out.to_parquet(path, engine="pyarrow", compression="zstd", index=False)
+
+    if emit_csv:
+        mapping_df.to_csv(output_dir / "mapping.csv", index=False, encoding="utf-8-sig")
+    return path
@@ -7,6 +7,7 @@ import json
 import logging
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 from pydantic import BaseModel, Field
 
@@ -130,19 +131,17 @@ Respond with valid JSON only. The CSV uses ';' as separator."""
 # Core function
 # ---------------------------------------------------------------------------
 
-def detect_tables(
-    llm_client: Any,
-    sheet_name: str,
-    df: pd.DataFrame,
-) -> List[TableDetection]:
-    """Use LLM to detect accounting tables in a sheet."""
+def detection_prompt_body(df: pd.DataFrame) -> str:
+    """Build the sheet-name independent part of the detection prompt.
+
+    Sheets with the same layout produce the same body, which lets callers
+    issue a single detection call for all of them.
+    """
     # New logic: CSV format, up to 1000 rows
     snapshot = make_sheet_snapshot(df, max_rows=1000, max_cols=25, format="csv")
     profile = column_profile(df)
 
-    prompt = f"""## Sheet: "{sheet_name}"
-
-### Snapshot (CSV format, first ~1000 rows):
+    return f"""### Snapshot (CSV format, first ~1000 rows):
 Note: Empty values are consecutive delimiters (;;).
 {snapshot}
 
@@ -153,6 +152,24 @@ Note: Empty values are consecutive delimiters (;;).
 
 Analyze this sheet and return the table detection result."""
 
+
+def detect_tables(
+    llm_client: Any,
+    sheet_name: str,
+    df: pd.DataFrame,
+    prompt_body: Optional[str] = None,
+) -> List[TableDetection]:
+    """Use LLM to detect accounting tables in a sheet.
+
+    ``prompt_body`` may be passed if it was already built via
+    :func:`detection_prompt_body` (e.g. for deduplication).
+    """
+    if prompt_body is None:
+        prompt_body = detection_prompt_body(df)
+    prompt = f"""## Sheet: "{sheet_name}"
+
+{prompt_body}"""
+
     result = llm_client.call(
         prompt=prompt,
         system_prompt=PROMPT_TABLE_DETECTOR,
@@ -201,47 +218,51 @@ def extract_by_detection(
     detection: TableDetection,
 ) -> pd.DataFrame:
     """Extract and standardize data from a DataFrame using table detection results."""
-    # Slice the table area
+    # Slice the table area (read-only, no copy needed)
     data = df.iloc[
         detection.start_row:detection.end_row + 1,
         detection.start_col:detection.end_col + 1,
-    ].copy()
-    data = data.reset_index(drop=True)
+    ].reset_index(drop=True)
 
     # Adjust column indices relative to start_col
     offset = detection.start_col
     roles = detection.column_roles
 
-    result = pd.DataFrame()
-    result["_original_row"] = range(
-        detection.start_row, detection.start_row + len(data)
-    )
+    # Spalten sammeln und den Frame in einem Schritt bauen
+    out = {
+        "_original_row": np.arange(detection.start_row, detection.start_row + len(data)),
+    }
+
+    def column(col_idx: int) -> Optional[pd.Series]:
+        adj = col_idx - offset
+        return data.iloc[:, adj] if 0 <= adj < data.shape[1] else None
 
     if roles.account_number_col is not None:
-        adj = roles.account_number_col - offset
-        if 0 <= adj < data.shape[1]:
-            result["konto_nr"] = data.iloc[:, adj].astype(str).str.strip()
+        col = column(roles.account_number_col)
+        if col is not None:
+            out["konto_nr"] = col.astype(str).str.strip()
 
     if roles.account_name_col is not None:
-        adj = roles.account_name_col - offset
-        if 0 <= adj < data.shape[1]:
-            result["konto_name"] = data.iloc[:, adj].astype(str).str.strip()
+        col = column(roles.account_name_col)
+        if col is not None:
+            out["konto_name"] = col.astype(str).str.strip()
 
     # Amount columns
     for role, col_idx in roles.amount_cols.items():
         if isinstance(col_idx, int):
-            adj = col_idx - offset
-            if 0 <= adj < data.shape[1]:
-                result[f"amount_{role}"] = data.iloc[:, adj]
+            col = column(col_idx)
+            if col is not None:
+                out[f"amount_{role}"] = col
         elif isinstance(col_idx, list):
             for i, ci in enumerate(col_idx):
-                adj = ci - offset
-                if 0 <= adj < data.shape[1]:
-                    result[f"amount_{role}_{i}"] = data.iloc[:, adj]
+                col = column(ci)
+                if col is not None:
+                    out[f"amount_{role}_{i}"] = col
 
     if roles.side_indicator_col is not None:
-        adj = roles.side_indicator_col - offset
-        if 0 <= adj < data.shape[1]:
-            result["side_indicator"] = data.iloc[:, adj].astype(str).str.strip()
+        col = column(roles.side_indicator_col)
+        if col is not None:
+            # Only a handful of distinct values (S/H, Soll/Haben, ...)
+            out["side_indicator"] = col.astype(str).str.strip().astype("category")
 
-    return result
+    return pd.DataFrame(out, copy=False)
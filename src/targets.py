@@ -12,6 +12,8 @@ from typing import Dict, List, Optional, Tuple
 import pandas as pd
 from pydantic import BaseModel, Field
 
+from .io_readers import HAS_CALAMINE
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,6 +31,29 @@ class TargetPosition(BaseModel):
     sheet: str = ""
 
 
+# Numbering patterns of position lines ("I. ", "A. ", "1. ") and slug cleanup
+_ROMAN_RE = re.compile(r"^[IVX]+\.\s")
+_LETTER_RE = re.compile(r"^[A-Z]\.\s")
+_NUMBERED_RE = re.compile(r"^\d+\.\s")
+_SLUG_INVALID_RE = re.compile(r"[^a-zA-Z0-9äöüÄÖÜß]")
+_SLUG_REPEAT_RE = re.compile(r"_+")
+
+
+# GuV keywords, one alternation per class instead of a substring test per keyword
+_ERTRAG_KEYWORDS = [
+    "erlös", "ertrag", "erträg", "umsatz", "revenue", "income", "gain",
+    "bestandsveränder", "eigenleistung", "sonstige betriebliche erträge",
+    "zinserträge", "beteiligungserträge", "venituri",
+]
+_AUFWAND_KEYWORDS = [
+    "aufwand", "aufwendung", "kosten", "abschreib", "material",
+    "personal", "miete", "expense", "cost", "depreciation",
+    "zinsaufwend", "steuer", "cheltuieli",
+]
+_ERTRAG_RE = re.compile("|".join(map(re.escape, _ERTRAG_KEYWORDS)))
+_AUFWAND_RE = re.compile("|".join(map(re.escape, _AUFWAND_KEYWORDS)))
+
+
 # ---------------------------------------------------------------------------
 # Core functions
 # ---------------------------------------------------------------------------
@@ -44,11 +69,17 @@ def load_targets(xls_path: str | Path) -> List[TargetPosition]:
 
     targets: List[TargetPosition] = []
 
-    try:
-        xls = pd.ExcelFile(xls_path, engine="xlrd")
-    except Exception:
-        # Fallback for newer format
-        xls = pd.ExcelFile(xls_path, engine="openpyxl")
+    # calamine (Rust) reads .xls and .xlsx several times faster; xlrd and
+    # openpyxl (newer format) remain as fallbacks
+    engines = (["calamine"] if HAS_CALAMINE else []) + ["xlrd", "openpyxl"]
+    for engine in engines:
+        try:
+            xls = pd.ExcelFile(xls_path, engine=engine)
+            break
+        except Exception:
+            if engine == engines[-1]:
+                raise
+            logger.debug("Could not open %s with %s, trying next engine", xls_path, engine)
 
     for sheet_name in xls.sheet_names:
         sheet_lower = sheet_name.strip().lower()
@@ -86,22 +117,22 @@ def _parse_hierarchy_sheet(
 
     Detects the main text column and builds hierarchy from indentation/numbering.
     """
-    # Find the main text column (the one with most non-empty text values)
-    best_col = 0
-    best_count = 0
-    for col_idx in range(min(df.shape[1], 10)):
-        col = df.iloc[:, col_idx].dropna().astype(str)
-        text_vals = col[col.str.len() > 2]
-        if len(text_vals) > best_count:
-            best_count = len(text_vals)
-            best_col = col_idx
+    # Find the main text column (the one with most non-empty text values,
+    # first one wins on ties). notna() is required: on pandas 2.x astype(str)
+    # turns empty cells into "nan", which would count as text.
+    sub = df.iloc[:, :10]
+    text_counts = (
+        sub.notna() & sub.astype(str).apply(lambda col: col.str.len()).gt(2)
+    ).sum().to_numpy()
+    best_col = int(text_counts.argmax()) if len(text_counts) else 0
 
     targets: List[TargetPosition] = []
     hierarchy_stack: List[Tuple[int, str]] = []  # (level, name)
     current_class = ""  # AKTIVA, PASSIVA, AUFWAND, ERTRAG
 
-    for row_idx in range(df.shape[0]):
-        cell = df.iat[row_idx, best_col]
+    # Pull the column once instead of one df.iat lookup per row
+    cells = df.iloc[:, best_col].to_numpy(dtype=object) if df.shape[1] else []
+    for row_idx, cell in enumerate(cells):
         if pd.isna(cell):
             continue
         text = str(cell).strip()
@@ -167,15 +198,15 @@ def _detect_level(text: str) -> int:
     text = text.strip()
 
     # Roman numeral sections: I., II., III., IV., etc.
-    if re.match(r"^[IVX]+\.\s", text):
+    if _ROMAN_RE.match(text):
         return base_level + 1
 
     # Letter sections: A., B., C., a), b)
-    if re.match(r"^[A-Z]\.\s", text):
+    if _LETTER_RE.match(text):
         return base_level
 
     # Numbered: 1., 2., 3.
-    if re.match(r"^\d+\.\s", text):
+    if _NUMBERED_RE.match(text):
         return base_level + 2
 
     return base_level + 3  # Default: leaf level
@@ -185,9 +216,9 @@ def _is_section_header(text: str) -> bool:
     """Check if a line is a section header rather than a leaf position."""
     text = text.strip()
     # Very short entries or single-word uppercase
-    if re.match(r"^[A-Z]\.\s", text):
+    if _LETTER_RE.match(text):
         return True
-    if re.match(r"^[IVX]+\.\s", text):
+    if _ROMAN_RE.match(text):
         return True
     if text.isupper() and len(text.split()) <= 3:
         return True
@@ -197,33 +228,19 @@ def _is_section_header(text: str) -> bool:
 def _guess_guv_class(text: str, current: str) -> str:
     """Guess whether a GuV position is AUFWAND or ERTRAG."""
     text_lower = text.lower()
-
-    ertrag_keywords = [
-        "erlös", "ertrag", "erträg", "umsatz", "revenue", "income", "gain",
-        "bestandsveränder", "eigenleistung", "sonstige betriebliche erträge",
-        "zinserträge", "beteiligungserträge", "venituri",
-    ]
-    aufwand_keywords = [
-        "aufwand", "aufwendung", "kosten", "abschreib", "material",
-        "personal", "miete", "expense", "cost", "depreciation",
-        "zinsaufwend", "steuer", "cheltuieli",
-    ]
-
-    for kw in ertrag_keywords:
-        if kw in text_lower:
-            return "ERTRAG"
-    for kw in aufwand_keywords:
-        if kw in text_lower:
-            return "AUFWAND"
-
+    # Ertrag keywords take precedence over Aufwand keywords
+    if _ERTRAG_RE.search(text_lower):
+        return "ERTRAG"
+    if _AUFWAND_RE.search(text_lower):
+        return "AUFWAND"
     return current
 
 
 def _make_target_id(text: str, row_idx: int, section: str = "") -> str:
     """Create a stable target ID from text."""
     # Slugify
-    slug = re.sub(r"[^a-zA-Z0-9äöüÄÖÜß]", "_", text.lower())
-    slug = re.sub(r"_+", "_", slug).strip("_")
+    slug = _SLUG_INVALID_RE.sub("_", text.lower())
+    slug = _SLUG_REPEAT_RE.sub("_", slug).strip("_")
     slug = slug[:60]
     # Add hash for uniqueness (includes section to avoid cross-sheet collisions)
     h = hashlib.md5(f"{section}_{text}_{row_idx}".encode()).hexdigest()[:10]
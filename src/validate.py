@@ -44,15 +44,17 @@ REPAIR_SCHEMA = {
 
 def run_checks(df: pd.DataFrame) -> Dict[str, Any]:
     """Run plausibility checks on the mapped data."""
-    accounts = df[df["row_type"] == "ACCOUNT"].copy()
+    accounts = df[df["row_type"] == "ACCOUNT"]  # read-only, no copy needed
     checks: Dict[str, Any] = {}
 
     # Balance check: Aktiva vs Passiva
     has_amounts = "amount_normalized" in accounts.columns
     
     if has_amounts:
-        aktiva = accounts[accounts["target_class"] == "AKTIVA"]["amount_normalized"].sum()
-        passiva = accounts[accounts["target_class"] == "PASSIVA"]["amount_normalized"].sum()
+        # One grouped pass over the amounts instead of one mask + sum per class
+        sums = accounts.groupby("target_class", sort=False)["amount_normalized"].sum()
+        aktiva = sums.get("AKTIVA", 0)
+        passiva = sums.get("PASSIVA", 0)
         checks["aktiva_sum"] = float(aktiva) if pd.notna(aktiva) else 0
         checks["passiva_sum"] = float(passiva) if pd.notna(passiva) else 0
         checks["balance_diff"] = checks["aktiva_sum"] - checks["passiva_sum"]
@@ -67,8 +69,8 @@ def run_checks(df: pd.DataFrame) -> Dict[str, Any]:
 
     # GuV check
     if has_amounts:
-        ertrag = accounts[accounts["target_class"] == "ERTRAG"]["amount_normalized"].sum()
-        aufwand = accounts[accounts["target_class"] == "AUFWAND"]["amount_normalized"].sum()
+        ertrag = sums.get("ERTRAG", 0)
+        aufwand = sums.get("AUFWAND", 0)
         checks["ertrag_sum"] = float(ertrag) if pd.notna(ertrag) else 0
         checks["aufwand_sum"] = float(aufwand) if pd.notna(aufwand) else 0
         checks["guv_result"] = checks["ertrag_sum"] - checks["aufwand_sum"]
@@ -102,7 +104,8 @@ def repair_mappings(
     max_rounds: int = 2,
 ) -> pd.DataFrame:
     """Iteratively repair mappings using LLM."""
-    df = df.copy()
+    # The input is copied only once the first repair is applied
+    original = df
 
     for round_num in range(1, max_rounds + 1):
         if not checks.get("has_issues"):
@@ -119,14 +122,24 @@ def repair_mappings(
         if suspects.empty:
             break
 
-        suspect_items = []
-        for _, row in suspects.iterrows():
-            suspect_items.append({
-                "konto_key": str(row.get("konto_nr", "")),
-                "konto_name": str(row.get("konto_name", "")),
-                "current_target": str(row.get("target_overpos_id", "")),
-                "amount": row.get("amount_normalized"),
-            })
+        # Column lists instead of one Series per suspect row
+        def column(name: str, default: Any = "") -> list:
+            if name in suspects.columns:
+                return suspects[name].tolist()
+            return [default] * len(suspects)
+
+        suspect_items = [
+            {
+                "konto_key": str(nr),
+                "konto_name": str(name),
+                "current_target": str(target),
+                "amount": amount,
+            }
+            for nr, name, target, amount in zip(
+                column("konto_nr"), column("konto_name"),
+                column("target_overpos_id"), column("amount_normalized", None),
+            )
+        ]
 
         prompt = (
             f"## Validation Issues:\n{json.dumps(checks, default=str)}\n\n"
@@ -148,16 +161,26 @@ def repair_mappings(
             logger.info("No repairs suggested in round %d", round_num)
             break
 
-        # Apply repairs
+        # Apply repairs: one lookup table (last repair per key wins) and one
+        # masked assignment per column instead of five per repair
+        if df is original:
+            df = df.copy()
+        latest = {}
         for repair in repairs:
             key = repair.get("konto_key", "")
-            mask = df["konto_nr"].astype(str) == key
-            if mask.any():
-                df.loc[mask, "target_overpos_id"] = repair.get("new_target_id", "UNMAPPED")
-                df.loc[mask, "target_overpos_name"] = repair.get("new_target_name", "")
-                df.loc[mask, "target_class"] = repair.get("new_target_class", "")
-                df.loc[mask, "confidence"] = 0.6
-                df.loc[mask, "rationale_short"] = f"Repaired R{round_num}: {repair.get('reason', '')}"
+            if isinstance(key, str):   # other types never matched the str keys
+                latest[key] = repair
+        konto_keys = df["konto_nr"].astype(str)
+        hit = konto_keys.isin(latest).to_numpy()
+        if hit.any():
+            applied = [latest[key] for key in konto_keys[hit]]
+            df.loc[hit, "target_overpos_id"] = [r.get("new_target_id", "UNMAPPED") for r in applied]
+            df.loc[hit, "target_overpos_name"] = [r.get("new_target_name", "") for r in applied]
+            df.loc[hit, "target_class"] = [r.get("new_target_class", "") for r in applied]
+            df.loc[hit, "confidence"] = 0.6
+            df.loc[hit, "rationale_short"] = [
+                f"Repaired R{round_num}: {r.get('reason', '')}" for r in applied
+            ]
 
         logger.info("Applied %d repairs in round %d", len(repairs), round_num)
         checks = run_checks(df)
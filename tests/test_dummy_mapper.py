@@ -0,0 +1,71 @@
+"""Tests for Dummy-OID assignment and Lucanet export (dummy_mapper)."""
+import pandas as pd
+
+from src.dummy_mapper import assign_dummy_ids, build_lucanet_df
+
+
+def _pool():
+    return {
+        "kasse": [
+            {"name": "Kasse 1", "oid": 101, "dimension": "Bilanz", "ueberpos_raw": "Kasse"},
+            {"name": "Kasse 2", "oid": 102, "dimension": "Bilanz", "ueberpos_raw": "Kasse"},
+        ],
+        "umsatzerlöse": [
+            {"name": "Umsatz 1", "oid": 201, "dimension": "GuV", "ueberpos_raw": "Umsatzerlöse"},
+        ],
+    }
+
+
+class TestAssignDummyIds:
+
+    def test_first_come_first_served(self):
+        df = pd.DataFrame([
+            {"row_type": "ACCOUNT", "target_overpos_id": "kasse", "target_overpos_name": "Kasse"},
+            {"row_type": "ACCOUNT", "target_overpos_id": "kasse", "target_overpos_name": "Kasse"},
+        ])
+        result = assign_dummy_ids(df, _pool())
+        assert result["dummy_name"].tolist() == ["Kasse 1", "Kasse 2"]
+        assert result["dummy_oid"].tolist() == [101, 102]
+
+    def test_pool_exhausted(self):
+        df = pd.DataFrame([
+            {"row_type": "ACCOUNT", "target_overpos_id": "umsatzerlöse", "target_overpos_name": "Umsatzerlöse"},
+            {"row_type": "ACCOUNT", "target_overpos_id": "umsatzerlöse", "target_overpos_name": "Umsatzerlöse"},
+        ])
+        result = assign_dummy_ids(df, _pool())
+        assert result["dummy_name"].tolist() == ["Umsatz 1", ""]
+        assert pd.isna(result["dummy_oid"].iloc[1])
+
+    def test_fallback_to_normalized_name(self):
+        df = pd.DataFrame([
+            {"row_type": "ACCOUNT", "target_overpos_id": "UNMAPPED", "target_overpos_name": "  KASSE "},
+        ])
+        result = assign_dummy_ids(df, _pool())
+        assert result["dummy_name"].tolist() == ["Kasse 1"]
+
+    def test_non_accounts_and_unmapped_skipped(self):
+        df = pd.DataFrame([
+            {"row_type": "TOTAL", "target_overpos_id": "kasse", "target_overpos_name": "Kasse"},
+            {"row_type": "ACCOUNT", "target_overpos_id": "UNMAPPED", "target_overpos_name": "UNMAPPED"},
+            {"row_type": "ACCOUNT", "target_overpos_id": "kasse", "target_overpos_name": "Kasse"},
+        ])
+        result = assign_dummy_ids(df, _pool())
+        assert result["dummy_name"].tolist() == ["", "", "Kasse 1"]
+        assert result["dummy_dimension"].tolist() == ["", "", "Bilanz"]
+
+
+class TestBuildLucanetDf:
+
+    def test_source_name_and_filter(self):
+        df = pd.DataFrame([
+            {"row_type": "ACCOUNT", "konto_nr": "1000", "konto_name": " Kasse",
+             "dummy_name": "Kasse 1", "dummy_oid": 101.0, "dummy_dimension": "Bilanz"},
+            {"row_type": "ACCOUNT", "konto_nr": None, "konto_name": "Bank",
+             "dummy_name": "Bank 1", "dummy_oid": 102.0, "dummy_dimension": "Bilanz"},
+            {"row_type": "ACCOUNT", "konto_nr": "1200", "konto_name": "Ohne Dummy",
+             "dummy_name": "", "dummy_oid": None, "dummy_dimension": ""},
+        ])
+        result = build_lucanet_df(df)
+        assert result["SourceName"].tolist() == ["1000 Kasse", "Bank"]
+        assert result["TargetElementID"].tolist() == [101, 102]
+        assert (result["Type"] == "Account").all()
@@ -0,0 +1,45 @@
+"""Tests for reading the KI mapping output (generate_lucanet_mapping.load_ki_output)."""
+import openpyxl
+import pytest
+
+from src.generate_lucanet_mapping import load_ki_output
+
+
+def _write(path, header, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+    return path
+
+
+class TestLoadKiOutput:
+
+    def test_standard_header(self, tmp_path):
+        path = _write(tmp_path / "ki.xlsx",
+                      ["Konto-Nr", "Konto-Name", "Kontonr & Bezeichnung",
+                       "Unsere Zuordnung (LucaNet)", "Target ID"],
+                      [[1000, "Kasse", "1000 Kasse", "Kassenbestand", "x"],
+                       [1001, "Leer", "1001 Leer", None, "x"]])
+        accounts = load_ki_output(path)
+        assert accounts == [{"source_name": "1000 Kasse", "zuordnung_raw": "Kassenbestand",
+                             "zuordnung_key": "kassenbestand"}]
+
+    @pytest.mark.parametrize("nr_header, zuordnung_header", [
+        ("Konto-Nr. (SKR04)", "Zuordnung LucaNet"),
+        ("Konto Nr", "LucaNet Position"),
+    ])
+    def test_headers_matched_by_substring(self, tmp_path, nr_header, zuordnung_header):
+        path = _write(tmp_path / "ki.xlsx",
+                      ["", nr_header, "Konto-Name", zuordnung_header],
+                      [[None, 4400, "Erlöse", "Umsatzerlöse"]])
+        accounts = load_ki_output(path)
+        assert accounts[0]["source_name"] == "4400 Erlöse"
+        assert accounts[0]["zuordnung_raw"] == "Umsatzerlöse"
+
+    def test_missing_column_raises(self, tmp_path):
+        path = _write(tmp_path / "ki.xlsx", ["Konto-Nr", "Konto-Name"], [[1, "a"]])
+        with pytest.raises(ValueError, match="Keine Spalte"):
+            load_ki_output(path)
@@ -0,0 +1,209 @@
+"""Tests for the SQLite response cache and batching of LLMClient (no API calls)."""
+import hashlib
+import json
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from src.llm_client import LLMClient
+
+
+def _client(tmp_path):
+    return LLMClient(api_key="test-key", cache_db_path=tmp_path / "cache.db")
+
+
+class TestLLMCache:
+
+    def test_roundtrip_before_and_after_flush(self, tmp_path):
+        llm = _client(tmp_path)
+        key = llm._make_cache_key("sys", "prompt", "v1")
+        assert llm._get_cache(key) is None
+        llm._set_cache(key, '{"ok": true}')
+        # Visible immediately, even before the writer thread committed it
+        assert llm._get_cache(key) == '{"ok": true}'
+        llm.flush_cache()
+        assert llm._get_cache(key) == '{"ok": true}'
+        llm.close()
+
+    def test_persisted_across_clients(self, tmp_path):
+        llm = _client(tmp_path)
+        keys = [llm._make_cache_key("sys", f"prompt {i}", "v1") for i in range(200)]
+        for i, key in enumerate(keys):
+            llm._set_cache(key, f"answer {i}")
+        llm.close()
+
+        llm = _client(tmp_path)
+        assert [llm._get_cache(k) for k in keys] == [f"answer {i}" for i in range(200)]
+        llm.close()
+
+    def test_queued_rows_flushed_at_exit_without_close(self, tmp_path):
+        db = tmp_path / "cache.db"
+        script = (
+            "from src.llm_client import LLMClient\n"
+            f"llm = LLMClient(api_key='test-key', cache_db_path={str(db)!r})\n"
+            "for i in range(500):\n"
+            "    llm._set_cache(llm._make_cache_key('sys', f'prompt {i}', 'v1'), f'answer {i}')\n"
+        )
+        subprocess.run([sys.executable, "-c", script], check=True,
+                       cwd=Path(__file__).parent.parent)
+
+        llm = _client(tmp_path)
+        keys = [llm._make_cache_key("sys", f"prompt {i}", "v1") for i in range(500)]
+        assert [llm._get_cache(k) for k in keys] == [f"answer {i}" for i in range(500)]
+        llm.close()
+
+    def test_cache_key_depends_on_params(self, tmp_path):
+        llm = _client(tmp_path)
+        a = llm._make_cache_key("sys", "prompt", "v1", params={"temperature": 0.1})
+        b = llm._make_cache_key("sys", "prompt", "v1", params={"temperature": 0.2})
+        assert a != b
+        llm.close()
+
+
+class TestLegacyCache:
+
+    def _legacy_db(self, tmp_path, model, system, prompt, answer):
+        db = tmp_path / "cache.db"
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE llm_cache (cache_key TEXT PRIMARY KEY, model TEXT, "
+                     "prompt_hash TEXT, system_hash TEXT, response_text TEXT, "
+                     "tokens_prompt INTEGER, tokens_completion INTEGER, "
+                     "latency_ms INTEGER, created_at REAL)")
+        key = hashlib.sha256(f"{model}||v1||{system}||{prompt}".encode()).hexdigest()
+        conn.execute("INSERT INTO llm_cache (cache_key, model, response_text, created_at) "
+                     "VALUES (?, ?, ?, 0)", (key, model, answer))
+        conn.commit()
+        conn.close()
+        return db
+
+    def test_legacy_rows_kept_and_served(self, tmp_path, monkeypatch):
+        db = self._legacy_db(tmp_path, "gpt-4o", "sys", "prompt", '{"old": 1}')
+        llm = LLMClient(model="gpt-4o", api_key="test-key", cache_db_path=db)
+
+        def no_api(*args, **kwargs):
+            raise AssertionError("legacy hit must not call the API")
+
+        monkeypatch.setattr(llm, "_call_with_retry", no_api)
+        assert llm.call("prompt", system_prompt="sys", json_schema={"type": "object"}) == {"old": 1}
+        llm.close()
+
+        conn = sqlite3.connect(db)
+        assert conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM llm_cache_v2").fetchone()[0] == 1
+        conn.close()
+
+
+class TestCallBatch:
+
+    def test_concurrent_batches_keep_item_order(self, tmp_path, monkeypatch):
+        llm = _client(tmp_path)
+
+        def fake_call(prompt, **kwargs):
+            time.sleep(random.random() / 100)   # finish out of order
+            return {"results": json.loads(prompt.split("ITEMS:", 1)[1])}
+
+        monkeypatch.setattr(llm, "call", fake_call)
+        items = [{"i": i} for i in range(25)]
+        result = llm.call_batch(items, "sys", "ITEMS:{{BATCH}}", batch_size=3)
+        assert result == items
+        llm.close()
+
+
+class FakeBatchAPI:
+    """Stands in for client.files / client.batches of the OpenAI SDK."""
+
+    def __init__(self, statuses, answers, output=True):
+        self.statuses = list(statuses)   # returned by successive retrieve() calls
+        self.answers = answers           # custom_id -> content, None = failed line
+        self.output = output
+        self.uploaded = []
+        self.retrieved = 0
+
+    # client.files
+    def create(self, file, purpose):
+        self.uploaded = [json.loads(line) for line in file[1].splitlines()]
+        return SimpleNamespace(id="file-in")
+
+    def content(self, file_id):
+        lines = []
+        for custom_id, text in self.answers.items():
+            if text is None:
+                lines.append({"custom_id": custom_id, "response": None,
+                              "error": {"code": "server_error"}})
+            else:
+                lines.append({"custom_id": custom_id, "error": None, "response": {
+                    "status_code": 200,
+                    "body": {"choices": [{"message": {"content": text}}],
+                             "usage": {"total_tokens": 7}},
+                }})
+        return SimpleNamespace(content="\n".join(json.dumps(l) for l in lines).encode())
+
+    # client.batches
+    def retrieve(self, batch_id):
+        status = self.statuses[min(self.retrieved, len(self.statuses) - 1)]
+        self.retrieved += 1
+        done = status in ("completed", "expired")
+        return SimpleNamespace(id=batch_id, status=status,
+                               output_file_id="file-out" if done and self.output else None)
+
+
+def _batch_client(tmp_path, monkeypatch, api):
+    llm = _client(tmp_path)
+    llm.client = SimpleNamespace(
+        files=SimpleNamespace(create=api.create, content=api.content),
+        batches=SimpleNamespace(create=lambda **kw: SimpleNamespace(id="batch-1"),
+                                retrieve=api.retrieve),
+    )
+    sleeps = []
+    monkeypatch.setattr("src.llm_client.time.sleep", sleeps.append)
+    return llm, sleeps
+
+
+class TestCallBatchAPI:
+
+    def _requests(self):
+        return [{"prompt": f"prompt {i}", "system_prompt": "sys", "json_schema": {"type": "object"}}
+                for i in range(3)]
+
+    def test_cache_hits_failed_lines_and_polling(self, tmp_path, monkeypatch):
+        api = FakeBatchAPI(["validating", "in_progress", "completed"],
+                           {"1": '{"a": 1}', "2": None})
+        llm, sleeps = _batch_client(tmp_path, monkeypatch, api)
+        requests = self._requests()
+        llm._set_cache(llm._make_cache_key("sys", "prompt 0", "v1",
+                                           params={"temperature": 0.1, "reasoning_effort": None}),
+                       '{"cached": true}')
+
+        results = llm.call_batch_api(requests, poll_interval=1, max_poll_interval=1.5)
+
+        assert [r["custom_id"] for r in api.uploaded] == ["1", "2"]
+        assert api.retrieved == 3
+        assert sleeps == [1, 1.5]
+        assert results == [{"cached": True}, {"a": 1}, {"_raw": "", "_parse_error": True}]
+        assert llm.stats["call_count"] == 1
+        # The answered request is cached, the failed one is not
+        assert llm.call_batch_api(requests[:2]) == [{"cached": True}, {"a": 1}]
+        assert api.retrieved == 3
+        llm.close()
+
+    def test_expired_job_keeps_partial_output(self, tmp_path, monkeypatch):
+        api = FakeBatchAPI(["expired"], {"0": '{"a": 0}'})
+        llm, _ = _batch_client(tmp_path, monkeypatch, api)
+        requests = self._requests()
+
+        with pytest.raises(RuntimeError, match="expired"):
+            llm.call_batch_api(requests)
+
+        # The finished request was cached before raising
+        api.statuses = ["failed"]
+        api.answers = {}
+        with pytest.raises(RuntimeError, match="failed"):
+            llm.call_batch_api(requests)
+        assert [r["custom_id"] for r in api.uploaded] == ["1", "2"]
+        llm.close()
@@ -0,0 +1,194 @@
+"""Tests for LLM account mapping (mapping.map_accounts) with a fake LLM client."""
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.llm_client import LLMClient
+from src.mapping import _compact_whitelist, map_accounts
+from src.targets import TargetPosition
+
+
+class FakeLLM:
+    """Maps every account of a batch to target 't1' and records the prompts."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def call(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        payload = prompt.split("one row per account):\n", 1)[1].split("\n\n", 1)[0]
+        batch = json.loads(payload)
+        key_idx = batch["columns"].index("konto_key")
+        return {"results": [
+            {"konto_key": row[key_idx], "target_id": "t1", "target_name": "Kasse",
+             "target_class": "AKTIVA", "confidence": 0.9}
+            for row in batch["rows"]
+        ]}
+
+
+class FlakyLLM(FakeLLM):
+    """Fails every batch that contains account 1000."""
+
+    def call(self, prompt, **kwargs):
+        if '"1000"' in prompt:
+            raise RuntimeError("LLM call failed after 3 attempts")
+        return super().call(prompt, **kwargs)
+
+
+TARGETS = [TargetPosition(target_id="t1", target_name="Kasse", target_class="AKTIVA")]
+
+
+def _accounts(n):
+    rows = [
+        {"row_type": "ACCOUNT", "konto_nr": str(1000 + i), "konto_name": f"Konto {i}",
+         "amount_normalized": float(i)}
+        for i in range(n)
+    ]
+    rows.append({"row_type": "TOTAL", "konto_nr": "", "konto_name": "Summe",
+                 "amount_normalized": 0.0})
+    return pd.DataFrame(rows)
+
+
+class TestMapAccounts:
+
+    def test_maps_all_accounts_in_batches(self):
+        llm = FakeLLM()
+        result = map_accounts(llm, _accounts(7), TARGETS, batch_size=3)
+        assert len(llm.prompts) == 3
+        accounts = result[result["row_type"] == "ACCOUNT"]
+        assert (accounts["target_overpos_id"] == "t1").all()
+        assert (accounts["confidence"] == 0.9).all()
+
+    def test_small_runs_spread_over_parallel_slots(self):
+        llm = FakeLLM()
+        map_accounts(llm, _accounts(40), TARGETS, batch_size=50, max_parallel=4)
+        assert [p.count('"Konto ') for p in llm.prompts] == [10, 10, 10, 10]
+
+    def test_exact_name_match_skips_llm(self):
+        llm = FakeLLM()
+        df = _accounts(2)
+        df.loc[0, "konto_name"] = "  KASSE "
+        result = map_accounts(llm, df, TARGETS)
+        assert len(llm.prompts) == 1
+        assert '"1000"' not in llm.prompts[0]
+        assert result.loc[0, "target_overpos_id"] == "t1"
+        assert result.loc[0, "confidence"] == 1.0
+        assert json.loads(result.loc[0, "mapping_flags"]) == ["local_name_match"]
+
+    def test_nameless_accounts_skip_llm(self):
+        llm = FakeLLM()
+        df = _accounts(3)
+        df.loc[0, "konto_name"] = "   "
+        df.loc[1, "konto_name"] = "4711"
+        result = map_accounts(llm, df, TARGETS)
+        assert len(llm.prompts) == 1
+        assert llm.prompts[0].count('"Konto ') == 1
+        assert result["target_overpos_id"].iloc[:3].tolist() == ["UNMAPPED", "UNMAPPED", "t1"]
+        assert result["confidence"].iloc[0] == 0.0
+
+    def test_nan_names_skip_llm(self):
+        llm = FakeLLM()
+        df = _accounts(3)
+        df["konto_name"] = df["konto_name"].astype(object)
+        df.loc[0, "konto_name"] = np.nan
+        df.loc[1, "konto_name"] = "nan"  # astype(str) of a missing cell
+        result = map_accounts(llm, df, TARGETS)
+        assert len(llm.prompts) == 1
+        assert llm.prompts[0].count('"Konto ') == 1
+        assert result["target_overpos_id"].iloc[:3].tolist() == ["UNMAPPED", "UNMAPPED", "t1"]
+
+    def test_repeated_accounts_sent_once(self):
+        llm = FakeLLM()
+        df = pd.concat([_accounts(3), _accounts(3)], ignore_index=True)  # two period sheets
+        result = map_accounts(llm, df, TARGETS)
+        assert len(llm.prompts) == 1
+        assert llm.prompts[0].count('["1000",') == 1
+        accounts = result[result["row_type"] == "ACCOUNT"]
+        assert (accounts["target_overpos_id"] == "t1").all()
+
+    def test_non_account_rows_left_empty(self):
+        result = map_accounts(FakeLLM(), _accounts(2), TARGETS)
+        total = result[result["row_type"] == "TOTAL"].iloc[0]
+        assert total["target_overpos_id"] == ""
+
+    def test_failed_batch_does_not_drop_others(self):
+        result = map_accounts(FlakyLLM(), _accounts(6), TARGETS, batch_size=3)
+        accounts = result[result["row_type"] == "ACCOUNT"]
+        assert accounts["target_overpos_id"].tolist() == ["UNMAPPED"] * 3 + ["t1"] * 3
+
+    def test_input_not_modified(self):
+        df = _accounts(2)
+        columns = list(df.columns)
+        map_accounts(FakeLLM(), df, TARGETS)
+        assert list(df.columns) == columns
+
+    def test_confidence_is_numeric(self):
+        result = map_accounts(FakeLLM(), _accounts(3), TARGETS)
+        assert result["confidence"].dtype == float
+        assert result.loc[result["row_type"] == "TOTAL", "confidence"].isna().all()
+
+    def test_missing_result_is_unmapped(self):
+        class EmptyLLM(FakeLLM):
+            def call(self, prompt, **kwargs):
+                return {"results": []}
+
+        result = map_accounts(EmptyLLM(), _accounts(2), TARGETS)
+        accounts = result[result["row_type"] == "ACCOUNT"]
+        assert (accounts["target_overpos_id"] == "UNMAPPED").all()
+
+    def test_batch_api_path(self):
+        class BatchLLM(FakeLLM):
+            def call_batch_api(self, requests):
+                return [self.call(**req) for req in requests]
+
+        llm = BatchLLM()
+        result = map_accounts(llm, _accounts(5), TARGETS, batch_size=2, use_batch_api=True)
+        assert len(llm.prompts) == 3
+        accounts = result[result["row_type"] == "ACCOUNT"]
+        assert (accounts["target_overpos_id"] == "t1").all()
+
+
+class TestAccountCache:
+
+    def test_second_run_answered_from_cache(self, tmp_path, monkeypatch):
+        llm = LLMClient(api_key="test-key", cache_db_path=tmp_path / "cache.db")
+        fake = FakeLLM()
+        monkeypatch.setattr(llm, "call", fake.call)
+
+        first = map_accounts(llm, _accounts(5), TARGETS, batch_size=2)
+        assert len(fake.prompts) == 3
+        # One new account → only that one goes to the LLM
+        second = map_accounts(llm, _accounts(6), TARGETS, batch_size=2)
+        assert len(fake.prompts) == 4
+        assert '"1005"' in fake.prompts[-1] and '"1000"' not in fake.prompts[-1]
+        assert second["target_overpos_id"].iloc[:5].tolist() == first["target_overpos_id"].iloc[:5].tolist()
+        assert (second.loc[second["row_type"] == "ACCOUNT", "confidence"] == 0.9).all()
+        llm.close()
+
+    def test_use_cache_false_skips_all_cache_lookups(self, tmp_path, monkeypatch):
+        llm = LLMClient(api_key="test-key", cache_db_path=tmp_path / "cache.db")
+        fake = FakeLLM()
+        lookups = []
+        monkeypatch.setattr(llm, "_get_cache", lambda key: lookups.append(key))
+        monkeypatch.setattr(llm, "_call_with_retry",
+                            lambda messages, *args, **kwargs: json.dumps(fake.call(messages[1]["content"])))
+
+        result = map_accounts(llm, _accounts(3), TARGETS, use_cache=False)
+        assert len(fake.prompts) == 1
+        assert lookups == []
+        assert (result.loc[result["row_type"] == "ACCOUNT", "target_overpos_id"] == "t1").all()
+        llm.close()
+
+
+class TestCompactWhitelist:
+
+    def test_parent_path_without_own_name(self):
+        whitelist = [
+            {"target_id": "a", "target_name": "A. Anlagevermögen", "hierarchy_path": "A. Anlagevermögen"},
+            {"target_id": "k", "target_name": "Kasse", "hierarchy_path": "A. Anlagevermögen > Kasse"},
+            {"target_id": "p", "target_name": "Pool", "hierarchy_path": ""},
+        ]
+        result = _compact_whitelist(whitelist)
+        assert [e.get("parent") for e in result] == [None, "A. Anlagevermögen", None]
+        assert all("hierarchy_path" not in e for e in result)
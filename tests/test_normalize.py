@@ -0,0 +1,77 @@
+"""Tests for row classification and amount normalization (normalize)."""
+import pandas as pd
+import pytest
+
+from src import normalize
+from src.normalize import RowClassificationRules, apply_classification, normalize_amounts
+
+
+class TestApplyClassification:
+
+    def _classify(self, rows, **rules):
+        df = pd.DataFrame(rows, columns=["konto_nr", "konto_name"])
+        return apply_classification(df, RowClassificationRules(**rules))["row_type"].tolist()
+
+    def test_priority_order(self):
+        rows = [
+            ("1000", "Summe Kasse"),        # account number wins over keyword
+            ("", "Summe Aktiva"),
+            ("", "Jahresüberschuss"),
+            ("", "Kontenklasse 1"),
+            ("", "---"),
+            ("", ""),
+        ]
+        assert self._classify(rows) == [
+            "ACCOUNT", "TOTAL", "CALCULATED_RESULT", "HEADER", "NOISE", "NOISE",
+        ]
+
+    def test_invalid_patterns_are_ignored(self):
+        rows = [("4711", "Bank"), ("", "***")]
+        assert self._classify(
+            rows, noise_patterns=["(", r"^\*+$"], account_number_pattern="("
+        ) == ["ACCOUNT", "NOISE"]
+
+    @pytest.mark.parametrize("use_automaton", [True, False])
+    def test_keywords_match_substrings(self, monkeypatch, use_automaton):
+        if use_automaton and not normalize.HAS_AHOCORASICK:
+            pytest.skip("pyahocorasick not installed")
+        monkeypatch.setattr(normalize, "HAS_AHOCORASICK", use_automaton)
+        rows = [("", "Zwischensumme Umlaufvermögen"), ("", "NET INCOME"), ("", "Anlagen")]
+        assert self._classify(rows) == ["TOTAL", "CALCULATED_RESULT", "HEADER"]
+
+
+class TestNormalizeAmounts:
+
+    def test_fallback_and_side_indicator(self):
+        df = pd.DataFrame({
+            "amount_end_balance": ["1.234,56", "", "abc"],
+            "amount_debit": ["10,00", "20,00", ""],
+            "side_indicator": ["H", "s ", "H"],
+        })
+        out = normalize_amounts(df, "end_balance")
+        assert out["amount_normalized"].iloc[:2].tolist() == [-1234.56, 20.0]
+        assert pd.isna(out["amount_normalized"].iloc[2])
+        assert out["amount_basis"].tolist() == [
+            "column: amount_end_balance", "column: amount_debit", "end_balance",
+        ]
+
+    def test_computed_treats_missing_as_zero(self):
+        df = pd.DataFrame({"amount_debit": ["100,00", ""], "amount_credit": ["", "30,00"]})
+        out = normalize_amounts(df, "computed:debit-credit")
+        assert out["amount_normalized"].tolist() == [100.0, -30.0]
+        assert set(out["amount_basis"]) == {"computed: debit - credit"}
+
+    def test_mixed_numeric_and_german_text_column(self):
+        # Mostly Excel numbers ("1234.5" → column votes "en"), plus German text cells
+        df = pd.DataFrame({"amount_end_balance": [
+            "1234.5", "99.25", "10.75", "7.5", "2.500,00", "1.000,00", "(3.000,50)", "1.234",
+        ]})
+        out = normalize_amounts(df, "end_balance", language_hint="de")
+        assert out["amount_normalized"].tolist() == [
+            1234.5, 99.25, 10.75, 7.5, 2500.0, 1000.0, -3000.5, 1.234,
+        ]
+
+    def test_input_frame_is_not_modified(self):
+        df = pd.DataFrame({"amount_end_balance": ["1,00"]})
+        normalize_amounts(df, "end_balance")
+        assert list(df.columns) == ["amount_end_balance"]
@@ -1,6 +1,9 @@
 """Tests for number parsing (io_readers.parse_number)."""
+import math
+
+import pandas as pd
 import pytest
-from src.io_readers import parse_number
+from src.io_readers import detect_column_locale, parse_number, parse_number_series
 
 
 class TestParseNumber:
@@ -63,3 +66,43 @@ class TestParseNumber:
 
     def test_zero_comma(self):
         assert parse_number("0,00") == 0.0
+
+
+class TestParseNumberSeries:
+    """parse_number_series must agree with the scalar parse_number."""
+
+    VALUES = ["1.234,56", "1234,56", "1,234.56", "(1.234,56)", "-1.234,56", "€ 1.234,56",
+              "1'234.56", "1.234", "1,234", "12,345", "0,00", "42", "", "  ", "abc", None]
+
+    @pytest.mark.parametrize("locale_hint", ["auto", "de", "en"])
+    def test_matches_scalar(self, locale_hint):
+        result = parse_number_series(pd.Series(self.VALUES, dtype=object), locale_hint)
+        for value, got in zip(self.VALUES, result):
+            expected = parse_number(value, locale_hint)
+            if expected is None:
+                assert math.isnan(got), value
+            else:
+                assert got == expected, value
+
+    def test_numeric_passthrough(self):
+        result = parse_number_series(pd.Series([1, 2.5]))
+        assert result.tolist() == [1.0, 2.5]
+
+    def test_mixed_object_column(self):
+        result = parse_number_series(pd.Series(["1,5", 3.5, None], dtype=object), "de")
+        assert result.iloc[:2].tolist() == [1.5, 3.5]
+        assert math.isnan(result.iloc[2])
+
+
+class TestDetectColumnLocale:
+
+    def test_german_column(self):
+        assert detect_column_locale(pd.Series(["1.234,56", "12,5", None, "1.234"]), default="en") == "de"
+
+    def test_excel_numeric_cells_read_as_str(self):
+        assert detect_column_locale(pd.Series(["1234.5", "0.1", "1000"]), default="de") == "en"
+
+    def test_ambiguous_falls_back_to_default(self):
+        values = pd.Series(["1.234", "1,234", "42", ""])
+        assert detect_column_locale(values, default="de") == "de"
+        assert detect_column_locale(values, default="en") == "en"
@@ -0,0 +1,19 @@
+"""Tests for hierarchy sheet parsing (no fixture file needed)."""
+import numpy as np
+import pandas as pd
+
+from src.targets import _parse_hierarchy_sheet
+
+
+class TestParseHierarchySheet:
+
+    def test_empty_leading_columns_do_not_win_text_column(self):
+        df = pd.DataFrame({
+            0: [np.nan, None, np.nan, np.nan],
+            1: ["A. Anlagevermögen", "I. Sachanlagen", "1. Grundstücke", "2. Maschinen"],
+            2: [np.nan, np.nan, np.nan, np.nan],
+        }, dtype=object)
+        targets = _parse_hierarchy_sheet(df, "Bilanz", "Bilanz")
+        names = [t.target_name for t in targets]
+        assert len(targets) == 4
+        assert any("Grundstücke" in n for n in names)
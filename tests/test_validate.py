@@ -0,0 +1,66 @@
+"""Tests for the plausibility checks and LLM repair application (validate)."""
+import pandas as pd
+
+from src.validate import repair_mappings, run_checks
+
+
+class FixedRepairLLM:
+    """Returns the same repairs for every repair round."""
+
+    def __init__(self, repairs):
+        self.repairs = repairs
+        self.calls = 0
+
+    def call(self, prompt, **kwargs):
+        self.calls += 1
+        return {"repairs": self.repairs}
+
+
+def _mapped(rows):
+    return pd.DataFrame(rows, columns=[
+        "row_type", "konto_nr", "target_overpos_id", "target_overpos_name",
+        "target_class", "confidence", "rationale_short", "amount_normalized",
+    ])
+
+
+class TestRunChecks:
+
+    def test_class_sums(self):
+        df = _mapped([
+            ("ACCOUNT", "1000", "t1", "Kasse", "AKTIVA", 0.9, "", 100.0),
+            ("ACCOUNT", "1200", "t1", "Bank", "AKTIVA", 0.9, "", None),
+            ("ACCOUNT", "3000", "t2", "EK", "PASSIVA", 0.9, "", 80.0),
+            ("TOTAL", "", "", "", "AKTIVA", 0.9, "", 999.0),
+        ])
+        checks = run_checks(df)
+        assert checks["aktiva_sum"] == 100.0
+        assert checks["passiva_sum"] == 80.0
+        assert checks["ertrag_sum"] == 0
+        assert checks["total_accounts"] == 3
+
+
+class TestRepairMappings:
+
+    def test_last_repair_per_key_wins_for_all_rows(self):
+        df = _mapped([
+            ("ACCOUNT", "1000", "UNMAPPED", "", "", 0.0, "", 10.0),
+            ("ACCOUNT", "1000", "UNMAPPED", "", "", 0.0, "", 20.0),
+            ("ACCOUNT", "1200", "t1", "Bank", "AKTIVA", 0.9, "", 5.0),
+        ])
+        llm = FixedRepairLLM([
+            {"konto_key": "1000", "new_target_id": "a", "reason": "first"},
+            {"konto_key": "1000", "new_target_id": "b", "new_target_class": "AKTIVA", "reason": "second"},
+            {"konto_key": "9999", "new_target_id": "c"},
+        ])
+        out = repair_mappings(llm, df, [], {"has_issues": True}, max_rounds=1)
+        assert out["target_overpos_id"].tolist() == ["b", "b", "t1"]
+        assert out["confidence"].tolist() == [0.6, 0.6, 0.9]
+        assert out["rationale_short"].iloc[0] == "Repaired R1: second"
+        assert df["target_overpos_id"].tolist() == ["UNMAPPED", "UNMAPPED", "t1"]
+
+    def test_no_issues_skips_llm(self):
+        df = _mapped([("ACCOUNT", "1000", "t1", "Kasse", "AKTIVA", 0.9, "", 1.0)])
+        llm = FixedRepairLLM([])
+        out = repair_mappings(llm, df, [], {"has_issues": False})
+        assert llm.calls == 0
+        assert out.equals(df)